@@ -0,0 +1,160 @@
+"""
+Load-test one StudentManagementSystem shared by concurrent reader and writer threads.
+
+Reader threads look up students and courses and rank course results; writer
+threads add students, rename them and upsert grades. Every thread uses the
+same system, so this exercises its per-thread sessions, the read-only engine
+and the retries on lock contention. By default a throwaway SQLite database
+is generated with the synthetic generator from seed.py; pass --database_url
+to load an existing database instead (writers do change its rows).
+
+    python benchmarks/load.py [--readers=8] [--writers=4] [--seconds=10] [--records=10000]
+"""
+import collections
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import func, select
+
+from lib.db import create_engine_from_config, get_engine, get_read_engine
+from lib.main import StudentManagementSystem
+from lib.models import Course, Student
+from lib.seed import generate_synthetic_data
+
+GRADES = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D', 'F']
+
+
+def operations(sms, students, course_codes, tag):
+    """The operations each role picks from at random, as name -> call(rng, i)."""
+    return {
+        'reader': {
+            'get_student_info': lambda rng, i: sms.get_student_info(rng.randint(1, students)),
+            'get_course_info': lambda rng, i: sms.get_course_info(rng.choice(course_codes)),
+            'rank_students_top10': lambda rng, i: sms.rank_students(rng.choice(course_codes), limit=10),
+            'list_students': lambda rng, i: sms.list_students(50, rng.randint(0, students)),
+        },
+        'writer': {
+            'add_student': lambda rng, i: sms.add_student("Load Student", f"load-{tag}-{i}@example.com", 20),
+            'update_student': lambda rng, i: sms.update_student(rng.randint(1, students), f"Renamed {i}"),
+            'upsert_performance_record': lambda rng, i: sms.upsert_performance_record(
+                rng.randint(1, students), rng.choice(course_codes), rng.choice(GRADES)),
+        },
+    }
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] if ordered else None
+
+
+def run_thread(sms, calls, deadline, seed, results):
+    """Call random operations until the deadline, recording latencies and errors."""
+    rng = random.Random(seed)
+    names = sorted(calls)
+    latencies, errors = [], collections.Counter()
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            call = calls[rng.choice(names)]
+            start = time.perf_counter()
+            try:
+                call(rng, f"{seed}-{i}")
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                sms.session.rollback()
+            latencies.append(time.perf_counter() - start)
+            i += 1
+    finally:
+        sms.close_sessions()
+    results.append((latencies, errors))
+
+
+def summarize(results, seconds):
+    latencies = sorted(latency for thread_latencies, _ in results for latency in thread_latencies)
+    errors = sum((thread_errors for _, thread_errors in results), collections.Counter())
+    total = len(latencies)
+    return {
+        'threads': len(results),
+        'operations': total,
+        'ops_per_second': round(total / seconds, 1),
+        'error_rate': round(sum(errors.values()) / total, 4) if total else 0.0,
+        'errors': dict(errors),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if total else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3) if total else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if total else None,
+    }
+
+
+def main(readers=8, writers=4, seconds=10.0, records=10000, seed=42, database_url=None, output=None):
+    """
+    Run the load test.
+
+    Args:
+        readers (int): Reader threads.
+        writers (int): Writer threads.
+        seconds (float): How long the threads keep calling operations.
+        records (int): Performance records in the generated database.
+        seed (int): Seed for the synthetic data and the random operations.
+        database_url (str): Use this database instead of generating one.
+        output (str): Save the results as JSON to this path.
+    """
+    with contextlib.ExitStack() as stack:
+        if database_url is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+            database_url = 'sqlite:///' + os.path.join(directory, 'load.db')
+            engine = create_engine_from_config(database_url)
+            start = time.perf_counter()
+            generate_synthetic_data(seed=seed, engine=engine, students=max(1, records // 5),
+                                    courses=max(5, records // 1000), enrollments_per_student=5)
+            print(f"Generated {records} records in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            engine.dispose()
+
+        # The system opens its engines from the settings, so point them at the database
+        os.environ['SMS_DATABASE_URL'] = database_url
+        sms = StudentManagementSystem()
+        students = sms.session.scalar(select(func.max(Student.id))) or 1
+        course_codes = list(sms.session.scalars(select(Course.course_code).order_by(Course.id).limit(1000)))
+        sms.close_sessions()
+
+        calls = operations(sms, students, course_codes, time.time_ns())
+        results = {'reader': [], 'writer': []}
+
+        # Commands print confirmations; keep them out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            deadline = time.perf_counter() + seconds
+            threads = [
+                threading.Thread(target=run_thread, args=(sms, calls[role], deadline, seed + n, results[role]))
+                for n, role in enumerate(['reader'] * readers + ['writer'] * writers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # Close the pooled connections before the temporary database goes away
+        for engine in (get_engine(), get_read_engine()):
+            if engine is not None:
+                engine.dispose()
+
+    report = {role: summarize(role_results, seconds) for role, role_results in results.items() if role_results}
+    for role, summary in report.items():
+        print(f"{role:<7} " + " ".join(f"{key}={value}" for key, value in summary.items()))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'seed': seed, 'seconds': seconds,
+                       'database': database_url.split('://')[0], 'results': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    import fire
+
+    fire.Fire(main)
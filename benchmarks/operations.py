@@ -0,0 +1,329 @@
+"""
+Time the StudentManagementSystem queries and commands at several dataset sizes.
+
+For each size a SQLite database with that many performance records is built
+with the synthetic generator from seed.py (about five records per student and
+a thousand per course). Every operation is then called repeatedly and the
+harness reports latency percentiles, rows per second and SQL statements per
+call. Results can be saved as JSON and compared against a stored baseline.
+The interactive shell, batch files, transaction() and the session and cache
+helpers are left out; batch and transaction() only wrap the commands timed here.
+
+    python benchmarks/operations.py --sizes=1000,100000,1000000 --output=results.json
+    python benchmarks/operations.py --sizes=1000 --baseline=results.json
+"""
+import contextlib
+import inspect
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from lib.db import create_engine_from_config
+from lib.main import StudentManagementSystem
+from lib.models import Student
+from lib.profiling import QueryProfiler, count_result_rows
+from lib.seed import LAST_NAMES, generate_synthetic_data
+
+
+def dataset_shape(records):
+    """Students and courses for a dataset with the given number of performance records."""
+    return {
+        'students': max(1, records // 5),
+        'courses': max(5, records // 1000),
+        'enrollments_per_student': 5,
+    }
+
+
+def open_dataset(records, seed, data_dir):
+    """Return an engine for a database of the given size, generating it if needed."""
+    path = os.path.join(data_dir, f"bench_{records}_{seed}.db")
+    exists = os.path.exists(path)
+    engine = create_engine_from_config('sqlite:///' + path)
+    if not exists:
+        start = time.perf_counter()
+        generate_synthetic_data(seed=seed, engine=engine, **dataset_shape(records))
+        print(f"Generated {records} records in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return engine
+
+
+# Rows in each file the import operations load
+IMPORT_ROWS = 1000
+
+
+def count_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for _ in f)
+
+
+def operations(sms, shape, rng, work_dir):
+    """
+    The benchmarked operations as name -> (prepare, call) pairs.
+
+    prepare(i) runs untimed and returns the arguments for call. The write
+    operations make their own rows so they never touch the generated data.
+    Import files and export output go to ``work_dir``.
+    """
+    students, courses = shape['students'], shape['courses']
+    tag = f"{time.time_ns()}"
+
+    def write_file(name, header, rows):
+        path = os.path.join(work_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(header + '\n')
+            f.writelines(','.join(map(str, row)) + '\n' for row in rows)
+        return path
+
+    def student_file(i):
+        return (write_file(f"students-{i}.csv", "name,email,age",
+                           (("Import Student", f"import-{tag}-{i}-{n}@example.com", 20) for n in range(IMPORT_ROWS))),)
+
+    def course_file(i):
+        return (write_file(f"courses-{i}.csv", "course_code,course_name,instructor,start_date,end_date",
+                           ((f"IMP-{tag}-{i}-{n}", "Import Course", "Bench", "2024-01-01", "2024-03-01")
+                            for n in range(IMPORT_ROWS))),)
+
+    def record_file(i):
+        # A new course per call keeps the imported pairs clear of existing records
+        code = f"IMPREC-{tag}-{i}"
+        sms.add_course("Bench Course", code, "Bench", "2024-01-01", "2024-03-01")
+        return (write_file(f"records-{i}.csv", "student_id,course_code,grade,num_days_present",
+                           ((student_id, code, "B", 10)
+                            for student_id in rng.sample(range(1, students + 1), min(students, IMPORT_ROWS)))),)
+
+    def export_performance_records(code):
+        # Exports report nothing back, so count the rows they wrote
+        path = os.path.join(work_dir, "records.ndjson")
+        sms.export_performance_records(code, output=path)
+        return count_lines(path)
+
+    def export_transcripts(code):
+        path = os.path.join(work_dir, "transcripts.ndjson")
+        sms.export_transcripts(course_code=code, output=path, file_format='ndjson')
+        return count_lines(path)
+
+    def attendance_file(i):
+        # Events for a new course's records, so ingesting never changes the generated data
+        code = f"ATT-{tag}-{i}"
+        student_ids = rng.sample(range(1, students + 1), min(students, IMPORT_ROWS // 10))
+        sms.add_course("Bench Course", code, "Bench", "2024-01-01", "2024-03-01")
+        sms.import_performance_records(write_file(f"attendance-records-{i}.csv", "student_id,course_code,grade",
+                                                  ((student_id, code, "B") for student_id in student_ids)))
+        return (write_file(f"attendance-{i}.csv", "student_id,course_code,date",
+                           ((student_id, code, f"2024-01-{day:02d}") for student_id in student_ids for day in range(1, 11))),)
+
+    def generate_reports(code):
+        # Progress goes to stderr; keep it out of the report too
+        with contextlib.redirect_stderr(io.StringIO()):
+            return sms.generate_reports(os.path.join(work_dir, "reports"), workers=1, course_codes=code)['records']
+
+    def random_student(i):
+        return (rng.randint(1, students),)
+
+    def random_course(i):
+        return (f"SYN{rng.randint(1, courses):06d}",)
+
+    def fresh_student(i):
+        sms.add_student("Bench Student", f"delete-{tag}-{i}@example.com", 20)
+        return (sms.session.query(Student.id).filter_by(student_email=f"delete-{tag}-{i}@example.com").scalar(),)
+
+    def fresh_course(i):
+        sms.add_course("Bench Course", f"DEL-{tag}-{i}", "Bench", "2024-01-01", "2024-03-01")
+        return (f"DEL-{tag}-{i}",)
+
+    def course_to_rename(i):
+        code = f"REN-{tag}"
+        if i == 0:
+            sms.add_course("Bench Course", code, "Bench", "2024-01-01", "2024-03-01")
+        return (code if i % 2 == 0 else code + "X", "Renamed Course", code + "X" if i % 2 == 0 else code)
+
+    def fresh_students(i):
+        emails = [f"bulk-{tag}-{i}-{n}@example.com" for n in range(10)]
+        for email in emails:
+            sms.add_student("Bench Student", email, 20)
+        return (list(sms.session.scalars(select(Student.id).where(Student.student_email.in_(emails)))),)
+
+    def upsert_record(i):
+        # Even calls insert into a new course, odd calls update the same record
+        code = f"UPS-{tag}-{i // 2}"
+        if i % 2 == 0:
+            sms.add_course("Bench Course", code, "Bench", "2024-01-01", "2024-03-01")
+        return ((i // 2) % students + 1, code, "A" if i % 2 else "B")
+
+    def record_course(i):
+        # A new course per call keeps add_performance_record clear of existing pairs
+        sms.add_course("Bench Course", f"REC-{tag}-{i}", "Bench", "2024-01-01", "2024-03-01")
+        return (rng.randint(1, students), f"REC-{tag}-{i}", "B+")
+
+    return {
+        'add_student': (lambda i: ("Bench Student", f"add-{tag}-{i}@example.com", 20), sms.add_student),
+        'add_course': (lambda i: ("Bench Course", f"ADD-{tag}-{i}", "Bench", "2024-01-01", "2024-03-01"), sms.add_course),
+        'add_performance_record': (record_course, sms.add_performance_record),
+        'update_student': (lambda i: (rng.randint(1, students), f"Renamed {i}"), sms.update_student),
+        'update_course': (course_to_rename, sms.update_course),
+        'delete_student': (fresh_student, sms.delete_student),
+        'delete_course': (fresh_course, sms.delete_course),
+        'delete_students': (fresh_students, sms.delete_students),
+        'delete_courses': (lambda i: ([fresh_course(i)[0]],), sms.delete_courses),
+        'upsert_student': (lambda i: ("Bench Student", f"upsert-{tag}-{i // 2}@example.com", 20), sms.upsert_student),
+        'upsert_performance_record': (upsert_record, sms.upsert_performance_record),
+        'get_student_info': (random_student, sms.get_student_info),
+        'get_student_infos': (lambda i: ([rng.randint(1, students) for _ in range(100)],), sms.get_student_infos),
+        'get_course_info': (random_course, sms.get_course_info),
+        'get_performance_records': (random_course, sms.get_performance_records),
+        'iter_performance_records': (random_course, lambda code: list(sms.iter_performance_records(code))),
+        'search': (lambda i: (rng.choice(LAST_NAMES)[:4],), sms.search),
+        'list_students': (lambda i: (50, rng.randint(0, students)), sms.list_students),
+        'list_courses': (lambda i: (50, rng.randint(0, courses)), sms.list_courses),
+        'list_performance_records': (lambda i: (50, rng.randint(0, students * 5)), sms.list_performance_records),
+        'export_performance_records': (random_course, export_performance_records),
+        'export_transcripts': (random_course, export_transcripts),
+        'import_students': (student_file, sms.import_students),
+        'import_courses': (course_file, sms.import_courses),
+        'import_performance_records': (record_file, sms.import_performance_records),
+        'ingest_attendance': (attendance_file, sms.ingest_attendance),
+        'get_low_attendance': (random_course, sms.get_low_attendance),
+        'rank_students': (random_course, sms.rank_students),
+        'rank_students_top10': (random_course, lambda code: sms.rank_students(code, limit=10)),
+        'get_course_stats': (random_course, sms.get_course_stats),
+        'rebuild_course_stats': (random_course, sms.rebuild_course_stats),
+        'analytics_snapshot': (lambda i: ([random_course(i)[0]],), sms.analytics_snapshot),
+        'generate_reports': (random_course, generate_reports),
+    }
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def count_rows(result):
+    """
+    Rows produced by one call: counted like the profiler's rows returned,
+    plus generators, which are read to the end, and a row count returned by
+    a wrapper. Commands that return nothing count as one.
+    """
+    if inspect.isgenerator(result):
+        return sum(1 for _ in result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    rows = count_result_rows(result)
+    return 1 if rows is None else rows
+
+
+def measure(engine, prepare, call, iterations):
+    # Only statements issued by the timed calls are counted, not by prepare()
+    profiler = QueryProfiler(engine, slow_query_ms=float('inf'))
+
+    latencies, rows = [], 0
+    for i in range(iterations):
+        args = prepare(i)
+        with profiler:
+            start = time.perf_counter()
+            result = call(*args)
+            rows += count_rows(result)
+            latencies.append(time.perf_counter() - start)
+
+    ordered = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'rows_per_second': round(rows / total, 1) if total else None,
+        'statements_per_call': round(len(profiler.statements) / iterations, 2),
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    Return (size, operation, baseline p50, current p50) for every regression.
+
+    An operation regresses when its p50 grew by more than ``threshold`` times
+    and by more than ``min_delta_ms``, so timer noise on sub-millisecond
+    operations is not reported.
+    """
+    regressions = []
+    for size, operations_results in results.items():
+        for name, result in operations_results.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if (previous and result['p50_ms'] > previous['p50_ms'] * threshold
+                    and result['p50_ms'] - previous['p50_ms'] > min_delta_ms):
+                regressions.append((size, name, previous['p50_ms'], result['p50_ms']))
+    return regressions
+
+
+def main(sizes='1000,100000,1000000', iterations=50, seed=42, output=None, baseline=None,
+         threshold=1.25, min_delta_ms=0.5, data_dir=None, only=None):
+    """
+    Run the benchmarks.
+
+    Args:
+        sizes: Comma-separated numbers of performance records.
+        iterations (int): Calls per operation and size.
+        seed (int): Seed for the synthetic data and the random arguments.
+        output (str): Save the results as JSON to this path.
+        baseline (str): JSON results to compare against; exits with status 1 on regressions.
+        threshold (float): Allowed p50 slowdown against the baseline, e.g. 1.25 for 25%.
+        min_delta_ms (float): Ignore slowdowns smaller than this many milliseconds.
+        data_dir (str): Keep generated databases here and reuse them on later runs.
+        only: Comma-separated operation names to run instead of all of them.
+    """
+    sizes = [int(size) for size in (sizes.split(',') if isinstance(sizes, str) else
+                                    sizes if isinstance(sizes, (list, tuple)) else [sizes])]
+    only = set(only.split(',') if isinstance(only, str) else only or [])
+
+    results = {}
+    with contextlib.ExitStack() as stack:
+        if data_dir is None:
+            data_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(data_dir, exist_ok=True)
+        work_dir = stack.enter_context(tempfile.TemporaryDirectory())
+
+        for records in sizes:
+            engine = open_dataset(records, seed, data_dir)
+            session = sessionmaker(bind=engine)()
+            sms = StudentManagementSystem(session=session)
+            rng = random.Random(seed)
+
+            results[str(records)] = {}
+            for name, (prepare, call) in operations(sms, dataset_shape(records), rng, work_dir).items():
+                if only and name not in only:
+                    continue
+                # Commands print confirmations; keep them out of the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[str(records)][name] = measure(engine, prepare, call, iterations)
+                print(f"{records:>9} {name:<26} " + " ".join(
+                    f"{key}={value}" for key, value in results[str(records)][name].items() if key != 'iterations'
+                ))
+
+            session.close()
+            engine.dispose()
+
+    report = {'python': sys.version.split()[0], 'seed': seed, 'iterations': iterations, 'results': results}
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), threshold, min_delta_ms)
+        for size, name, before, after in regressions:
+            print(f"REGRESSION {name} at {size} records: p50 {before}ms -> {after}ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    import fire
+
+    fire.Fire(main)
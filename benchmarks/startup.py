@@ -0,0 +1,86 @@
+"""
+Measure cold-start latency of the CLI.
+
+Every run starts a fresh interpreter, exactly like a cron job or shell script
+calling ``python -m lib.main <command>``, against a throwaway SQLite database
+filled with the mock data from seed.py.
+
+    python benchmarks/startup.py [--runs=10] [--output=startup.json]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Interpreter arguments for each measured command
+COMMANDS = {
+    'import lib.main': ['-c', 'import lib.main'],
+    'get_course_info': ['-m', 'lib.main', 'get_course_info', 'MATH101'],
+    'get_student_info': ['-m', 'lib.main', 'get_student_info', '1'],
+    'get_performance_records': ['-m', 'lib.main', 'get_performance_records', 'MATH101'],
+    'rank_students': ['-m', 'lib.main', 'rank_students', 'MATH101'],
+    'update_student': ['-m', 'lib.main', 'update_student', '1', 'John Doe'],
+}
+
+
+def run(args, env):
+    subprocess.run([sys.executable, *args], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def time_command(args, env, runs):
+    """Return the wall time of each run in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run(args, env)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 1),
+        'median_ms': round(statistics.median(ordered), 1),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        'max_ms': round(ordered[-1], 1),
+    }
+
+
+def main(runs=10, output=None):
+    """Time each command `runs` times and print (or save) the results."""
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            'PYTHONPATH': ROOT,
+            'SMS_DATABASE_URL': 'sqlite:///' + os.path.join(directory, 'startup.db'),
+        }
+        run(['-m', 'lib.main', 'init_db'], env)
+        run(['-m', 'lib.seed'], env)
+
+        # Warm the bytecode cache so the first measured run is not an outlier
+        for args in COMMANDS.values():
+            run(args, env)
+
+        results = {name: summarize(time_command(args, env, runs)) for name, args in COMMANDS.items()}
+
+    print(f"{'command':<26}{'min':>9}{'median':>9}{'p95':>9}{'max':>9}  (ms)")
+    for name, result in results.items():
+        print(f"{name:<26}{result['min_ms']:>9}{result['median_ms']:>9}{result['p95_ms']:>9}{result['max_ms']:>9}")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    import fire
+
+    fire.Fire(main)
@@ -0,0 +1,98 @@
+"""
+Compare write throughput with a commit per command and with sms.transaction().
+
+The same number of add_performance_record calls is made twice against a
+throwaway SQLite database: once committing after every call, and once inside
+a single ``with sms.transaction():`` block that commits at the end. The
+harness reports records per second and commits for each mode, and the
+speedup together with the SQLite synchronous setting that produced it.
+
+    python benchmarks/transactions.py [--records=500] [--synchronous=FULL] [--output=transactions.json]
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import sessionmaker
+
+from lib.db import create_engine_from_config, load_settings
+from lib.main import StudentManagementSystem
+from lib.models import Base, Student
+
+
+def add_records(sms, course_code, student_ids, grouped):
+    """Add one record per student, returning the elapsed seconds."""
+    start = time.perf_counter()
+    # Commands print confirmations; keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        with sms.transaction() if grouped else contextlib.nullcontext():
+            for student_id in student_ids:
+                sms.add_performance_record(student_id, course_code, "B+")
+    return time.perf_counter() - start
+
+
+def main(records=500, synchronous='NORMAL', output=None):
+    """
+    Run the benchmark.
+
+    Args:
+        records (int): add_performance_record calls per mode.
+        synchronous (str): SQLite synchronous setting; FULL syncs to disk on
+                           every commit, NORMAL (the default) at checkpoints.
+        output (str): Save the results as JSON to this path.
+    """
+    settings = {**load_settings(), 'sqlite_synchronous': synchronous}
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine_from_config('sqlite:///' + os.path.join(directory, 'transactions.db'), settings)
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Student), [
+                {"student_name": f"Student {i}", "student_email": f"student{i}@example.com", "age": 20}
+                for i in range(1, records + 1)
+            ])
+
+        session = sessionmaker(bind=engine)()
+        sms = StudentManagementSystem(session=session)
+        commits = []
+        event.listen(session, "after_commit", lambda session: commits.append(1))
+
+        for mode, grouped in (('commit_per_call', False), ('transaction', True)):
+            course_code = f"BENCH-{mode}"
+            with contextlib.redirect_stdout(io.StringIO()):
+                sms.add_course("Bench Course", course_code, "Bench", "2024-01-01", "2024-03-01")
+            commits.clear()
+
+            seconds = add_records(sms, course_code, range(1, records + 1), grouped)
+            results[mode] = {
+                'records': records,
+                'seconds': round(seconds, 3),
+                'records_per_second': round(records / seconds, 1),
+                'commits': len(commits),
+            }
+            print(f"{mode:<16} " + " ".join(f"{key}={value}" for key, value in results[mode].items()))
+
+        session.close()
+        engine.dispose()
+
+    speedup = results['transaction']['records_per_second'] / results['commit_per_call']['records_per_second']
+    print(f"transaction() is {speedup:.1f}x faster with synchronous={synchronous}")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'synchronous': synchronous,
+                       'speedup': round(speedup, 2), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    import fire
+
+    fire.Fire(main)
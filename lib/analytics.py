@@ -0,0 +1,243 @@
+import math
+from array import array
+
+from sqlalchemy import select
+
+from .models import GRADE_POINTS, Course, PerformanceRecord, days_between
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; without it the same answers come from plain Python, only slower
+    numpy = None
+
+# Stored columns and their array typecodes. Four bytes per ID and day count,
+# one for the grade and eight for grade points: 25 bytes per record.
+TYPECODES = {
+    'student_id': 'i',
+    'course_id': 'i',
+    # Index into AnalyticsSnapshot.grades, -1 for no grade
+    'grade': 'b',
+    # NaN where the grade has no grade points
+    'grade_points': 'd',
+    'days_present': 'i',
+    'total_days': 'i',
+}
+
+# Numeric columns that can be aggregated; attendance is derived from the day counts
+NUMERIC_COLUMNS = ('grade_points', 'days_present', 'total_days', 'attendance')
+
+
+class AnalyticsSnapshot:
+    """
+    Performance records held as compact columns for in-memory analytics.
+
+    Each column is an ``array.array`` rather than a list of ORM objects, so a
+    million records take about 25 MB. With NumPy installed the columns are
+    wrapped without copying and every aggregate is vectorized; otherwise the
+    same methods fall back to plain Python.
+
+        snapshot = sms.analytics_snapshot()
+        snapshot.percentile('attendance', 10)
+        snapshot.grade_histogram(course_id=3)
+    """
+
+    def __init__(self):
+        self.columns = {name: array(typecode) for name, typecode in TYPECODES.items()}
+        # Grade letters in the order their codes are assigned
+        self.grades = list(GRADE_POINTS)
+        self._grade_codes = {grade: code for code, grade in enumerate(self.grades)}
+        # Sorted copies of columns already asked for a percentile, by (column, course ID)
+        self._sorted = {}
+
+    @classmethod
+    def load(cls, session, course_ids=None, batch_size: int = 10000):
+        """
+        Read performance records and their course lengths into a new snapshot.
+
+        Rows are streamed ``batch_size`` at a time as plain tuples, so no ORM
+        objects are created and memory stays close to the size of the arrays.
+        """
+        statement = (
+            select(
+                PerformanceRecord.student_id,
+                PerformanceRecord.course_id,
+                PerformanceRecord.grade,
+                PerformanceRecord.grade_points,
+                PerformanceRecord._num_days_present,
+                (days_between(Course.start_date, Course.end_date) + 1).label('total_days'),
+            )
+            .join(Course, Course.id == PerformanceRecord.course_id)
+            .execution_options(yield_per=batch_size)
+        )
+        if course_ids is not None:
+            statement = statement.where(PerformanceRecord.course_id.in_(course_ids))
+
+        snapshot = cls()
+        for rows in session.execute(statement).partitions():
+            snapshot.extend(rows)
+        return snapshot
+
+    def extend(self, rows):
+        """Append (student_id, course_id, grade, grade_points, days_present, total_days) rows."""
+        columns = self.columns
+        self._sorted.clear()
+        for student_id, course_id, grade, grade_points, days_present, total_days in rows:
+            columns['student_id'].append(student_id)
+            columns['course_id'].append(course_id)
+            columns['grade'].append(self._grade_code(grade))
+            columns['grade_points'].append(math.nan if grade_points is None else grade_points)
+            columns['days_present'].append(days_present or 0)
+            columns['total_days'].append(total_days or 0)
+
+    def _grade_code(self, grade):
+        if grade is None:
+            return -1
+        code = self._grade_codes.get(grade)
+        if code is None:
+            # A grade outside GRADE_POINTS; codes are one signed byte
+            if len(self.grades) >= 127:
+                raise ValueError("Too many distinct grades for a snapshot.")
+            code = self._grade_codes[grade] = len(self.grades)
+            self.grades.append(grade)
+        return code
+
+    def __len__(self):
+        return len(self.columns['student_id'])
+
+    @property
+    def nbytes(self):
+        """Memory used by the column data."""
+        return sum(column.itemsize * len(column) for column in self.columns.values())
+
+    def column(self, name, course_id=None):
+        """
+        Return a column's values, optionally only for one course.
+
+        A NumPy array when NumPy is installed (a zero-copy view of the whole
+        column), otherwise a list or array. ``attendance`` is computed from
+        the day counts the same way as ``PerformanceRecord.attendance``.
+        """
+        if name == 'attendance':
+            present = self.column('days_present', course_id)
+            total = self.column('total_days', course_id)
+            if numpy is not None:
+                with numpy.errstate(divide='ignore', invalid='ignore'):
+                    return numpy.where(total > 0, present / total * 100, 0.0)
+            return [p / t * 100 if t > 0 else 0.0 for p, t in zip(present, total)]
+
+        values = self.columns[name]
+        if numpy is not None:
+            values = numpy.frombuffer(values, dtype=values.typecode) if len(values) else numpy.array([], values.typecode)
+            return values if course_id is None else values[self._course_mask(course_id)]
+        if course_id is None:
+            return values
+        return [value for value, course in zip(values, self.columns['course_id']) if course == course_id]
+
+    def _course_mask(self, course_id):
+        return numpy.frombuffer(self.columns['course_id'], dtype='i') == course_id
+
+    def _numeric(self, name, course_id):
+        # The values of a numeric column with missing grade points left out
+        if name not in NUMERIC_COLUMNS:
+            raise ValueError(f"Not a numeric column: {name}")
+        values = self.column(name, course_id)
+        if numpy is not None:
+            return values[~numpy.isnan(values)] if values.dtype.kind == 'f' else values
+        return [value for value in values if value == value]
+
+    def count(self, course_id=None):
+        """Number of records, optionally in one course."""
+        if course_id is None:
+            return len(self)
+        return len(self.column('course_id', course_id))
+
+    def mean(self, name, course_id=None):
+        """Mean of a numeric column, or None if there are no values."""
+        values = self._numeric(name, course_id)
+        if not len(values):
+            return None
+        if numpy is not None:
+            return float(values.mean())
+        return math.fsum(values) / len(values)
+
+    def percentile(self, name, q, course_id=None):
+        """
+        The q-th percentile (0-100) of a numeric column, or None if there are no values.
+
+        Interpolates linearly between the closest values, like NumPy's default.
+        The sorted column is kept, so further percentiles of the same column
+        and course only cost a lookup.
+        """
+        if not 0 <= q <= 100:
+            raise ValueError("q must be between 0 and 100.")
+        key = (name, course_id)
+        if key not in self._sorted:
+            values = self._numeric(name, course_id)
+            self._sorted[key] = numpy.sort(values) if numpy is not None else array('d', sorted(values))
+        ordered = self._sorted[key]
+        if not len(ordered):
+            return None
+
+        position = (len(ordered) - 1) * q / 100
+        lower = math.floor(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return float(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+
+    def grade_histogram(self, course_id=None):
+        """Records per letter grade, in GRADE_POINTS order; ungraded records are counted under None."""
+        codes = self.column('grade', course_id)
+        if numpy is not None:
+            counts = numpy.bincount(codes.astype(numpy.int16) + 1, minlength=len(self.grades) + 1).tolist()
+        else:
+            counts = [0] * (len(self.grades) + 1)
+            for code in codes:
+                counts[code + 1] += 1
+
+        histogram = {grade: count for grade, count in zip(self.grades, counts[1:]) if count}
+        if counts[0]:
+            histogram[None] = counts[0]
+        return histogram
+
+    def correlation(self, x='attendance', y='grade_points', course_id=None):
+        """Pearson correlation of two numeric columns over records that have both, or None."""
+        xs, ys = self.column(x, course_id), self.column(y, course_id)
+        if numpy is not None:
+            keep = ~(numpy.isnan(xs) | numpy.isnan(ys)) if xs.dtype.kind == 'f' or ys.dtype.kind == 'f' else slice(None)
+            xs, ys = numpy.asarray(xs, dtype=float)[keep], numpy.asarray(ys, dtype=float)[keep]
+            if len(xs) < 2 or xs.std() == 0 or ys.std() == 0:
+                return None
+            return float(numpy.corrcoef(xs, ys)[0, 1])
+
+        pairs = [(a, b) for a, b in zip(xs, ys) if a == a and b == b]
+        if len(pairs) < 2:
+            return None
+        mean_x = math.fsum(a for a, _ in pairs) / len(pairs)
+        mean_y = math.fsum(b for _, b in pairs) / len(pairs)
+        covariance = math.fsum((a - mean_x) * (b - mean_y) for a, b in pairs)
+        spread_x = math.sqrt(math.fsum((a - mean_x) ** 2 for a, _ in pairs))
+        spread_y = math.sqrt(math.fsum((b - mean_y) ** 2 for _, b in pairs))
+        if spread_x == 0 or spread_y == 0:
+            return None
+        return covariance / (spread_x * spread_y)
+
+    def course_means(self, name):
+        """Mean of a numeric column per course ID, skipping missing values."""
+        if name not in NUMERIC_COLUMNS:
+            raise ValueError(f"Not a numeric column: {name}")
+        values = self.column(name)
+        courses = self.column('course_id')
+
+        if numpy is not None:
+            values = numpy.asarray(values, dtype=float)
+            keep = ~numpy.isnan(values)
+            courses, values = courses[keep], values[keep]
+            totals = numpy.bincount(courses, weights=values)
+            counts = numpy.bincount(courses)
+            return {int(course): float(totals[course] / counts[course]) for course in numpy.flatnonzero(counts)}
+
+        totals, counts = {}, {}
+        for value, course in zip(values, courses):
+            if value == value:
+                totals[course] = totals.get(course, 0.0) + value
+                counts[course] = counts.get(course, 0) + 1
+        return {course: totals[course] / counts[course] for course in sorted(totals)}
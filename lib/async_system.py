@@ -0,0 +1,75 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import LRUCache
+from .db import get_session_factory
+from .main import StudentManagementSystem
+
+# Commands that only make sense in a terminal or on one long-lived system
+INTERACTIVE_COMMANDS = {'batch', 'shell', 'transaction', 'close_sessions'}
+
+
+class AsyncStudentManagementSystem:
+    """
+    Asyncio facade over StudentManagementSystem.
+
+    Every StudentManagementSystem command is available as a coroutine with the
+    same name and arguments. Calls run on a bounded thread pool and each one
+    gets its own session, so concurrent calls overlap instead of blocking the
+    event loop or sharing session state.
+
+        async with AsyncStudentManagementSystem(max_workers=16) as sms:
+            infos = await asyncio.gather(*(sms.get_student_info(i) for i in ids))
+    """
+
+    def __init__(self, session_factory=None, max_workers: int = 8, course_cache=None):
+        self._session_factory = session_factory or get_session_factory()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sms')
+        # One course cache shared by every call, since each call gets a new system
+        self.course_cache = course_cache if course_cache is not None else LRUCache()
+
+    def _call(self, name, args, kwargs):
+        # Runs on a worker thread with a session nobody else is using
+        session = self._session_factory()
+        try:
+            sms = StudentManagementSystem(session=session, course_cache=self.course_cache)
+            result = getattr(sms, name)(*args, **kwargs)
+            # Generators read from the session, so drain them before it closes
+            if inspect.isgenerator(result):
+                result = list(result)
+            return result
+        finally:
+            session.close()
+
+    async def run(self, name, *args, **kwargs):
+        """Run the named StudentManagementSystem command on the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._call, name, args, kwargs))
+
+    def close(self, wait: bool = True):
+        """Shut down the thread pool."""
+        self._executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _make_coroutine(name, method):
+    async def command(self, *args, **kwargs):
+        return await self.run(name, *args, **kwargs)
+
+    command.__name__ = name
+    command.__qualname__ = f"AsyncStudentManagementSystem.{name}"
+    command.__doc__ = method.__doc__
+    return command
+
+
+# Mirror every public command as a coroutine method
+for _name, _method in inspect.getmembers(StudentManagementSystem, inspect.isfunction):
+    if not _name.startswith('_') and _name not in INTERACTIVE_COMMANDS:
+        setattr(AsyncStudentManagementSystem, _name, _make_coroutine(_name, _method))
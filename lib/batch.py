@@ -0,0 +1,173 @@
+import inspect
+import shlex
+import sys
+
+# Commands that cannot be run from inside a batch or the shell
+NOT_BATCHABLE = {'batch', 'shell', 'transaction', 'close_sessions'}
+
+
+def parse_value(value):
+    """Convert a command-line string the same way the fire CLI does."""
+    from fire.parser import DefaultParseValue
+
+    return DefaultParseValue(value)
+
+
+def parse_command(line):
+    """
+    Split a command line into (command, args, kwargs).
+
+    Uses the same syntax as the CLI: positional arguments, ``--name=value``
+    or ``--name value`` options, and bare ``--flag`` / ``--noflag`` switches.
+    Returns None for blank lines and ``#`` comments.
+    """
+    tokens = shlex.split(line, comments=True)
+    if not tokens:
+        return None
+
+    command, rest = tokens[0].replace('-', '_'), tokens[1:]
+    args, kwargs = [], {}
+
+    i = 0
+    while i < len(rest):
+        token = rest[i]
+        if token.startswith('--') and len(token) > 2:
+            name, separator, value = token[2:].partition('=')
+            name = name.replace('-', '_')
+            if separator:
+                kwargs[name] = parse_value(value)
+            elif i + 1 < len(rest) and not rest[i + 1].startswith('--'):
+                kwargs[name] = parse_value(rest[i + 1])
+                i += 1
+            elif name.startswith('no') and len(name) > 2:
+                kwargs[name[2:]] = False
+            else:
+                kwargs[name] = True
+        else:
+            args.append(parse_value(token))
+        i += 1
+
+    return command, args, kwargs
+
+
+def format_result(result):
+    """Render a command's return value roughly the way fire prints it."""
+    if result is None:
+        return None
+    if isinstance(result, dict):
+        return '\n'.join(f"{key}: {value}" for key, value in result.items())
+    if isinstance(result, (list, tuple)) or inspect.isgenerator(result):
+        return '\n'.join(str(item) for item in result)
+    return str(result)
+
+
+def run_command(sms, line):
+    """Parse and run one command line against a StudentManagementSystem."""
+    parsed = parse_command(line)
+    if parsed is None:
+        return None
+
+    command, args, kwargs = parsed
+    method = getattr(sms, command, None)
+    if command.startswith('_') or command in NOT_BATCHABLE or not callable(method):
+        raise ValueError(f"Unknown command: {command}")
+
+    from .profiling import profile_command, profiling_enabled
+
+    if profiling_enabled():
+        with profile_command(command) as command_profile:
+            result = command_profile.result = method(*args, **kwargs)
+    else:
+        result = method(*args, **kwargs)
+
+    output = format_result(result)
+    if output is not None:
+        print(output)
+    return command
+
+
+def run_batch(sms, lines, transaction=False, stop_on_error=False):
+    """
+    Run many command lines against one StudentManagementSystem.
+
+    With ``transaction`` set, the batch runs inside ``sms.transaction()``:
+    every command only flushes and the whole batch is committed once at the
+    end; the first failure rolls everything back. Otherwise each command
+    commits on its own and a failed command is rolled back and reported
+    without stopping the batch (unless ``stop_on_error``).
+
+    Inside an enclosing ``sms.transaction()`` the batch joins it: nothing is
+    committed here, and the first failure is raised so the enclosing block
+    rolls back.
+
+    Returns:
+        dict: ``{"commands": int, "errors": int, "committed": bool}``
+    """
+    summary = {"commands": 0, "errors": 0, "committed": False}
+    joined = sms._state.defer_commit
+
+    def run_lines(grouped):
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                if run_command(sms, line) is not None:
+                    summary["commands"] += 1
+            except Exception as e:
+                summary["errors"] += 1
+                print(f"Line {line_number}: {type(e).__name__}: {e}", file=sys.stderr)
+                # A grouped batch is rolled back as a whole by sms.transaction()
+                if grouped:
+                    raise
+                sms._rollback()
+                if stop_on_error:
+                    return
+
+    if joined:
+        run_lines(grouped=True)
+        return summary
+
+    if transaction:
+        try:
+            with sms.transaction():
+                run_lines(grouped=True)
+        except Exception:
+            print("Rolled back the whole batch.", file=sys.stderr)
+            return summary
+        summary["committed"] = True
+        return summary
+
+    run_lines(grouped=False)
+    sms.session.commit()
+    summary["committed"] = True
+    return summary
+
+
+def run_shell(sms, prompt='sms> '):
+    """Read and run commands interactively until EOF or 'exit'."""
+    try:
+        import readline  # noqa: F401 - enables line editing and history for input()
+    except ImportError:
+        pass
+
+    print("Student Management System shell. Type 'help' for commands, 'exit' to quit.")
+    while True:
+        try:
+            line = input(prompt)
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+
+        if line.strip() in ('exit', 'quit'):
+            return
+        if line.strip() == 'help':
+            commands = sorted(
+                name for name in dir(sms)
+                if not name.startswith('_') and name not in NOT_BATCHABLE and callable(getattr(sms, name))
+            )
+            print('\n'.join(commands))
+            continue
+
+        try:
+            run_command(sms, line)
+        except Exception as e:
+            sms._rollback()
+            print(f"{type(e).__name__}: {e}", file=sys.stderr)
@@ -0,0 +1,252 @@
+import configparser
+import os
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+# Used when neither the environment nor a config file names a database
+DEFAULT_DATABASE_URL = 'sqlite:///student_management.db'
+
+# Config file read when SMS_CONFIG does not point somewhere else
+DEFAULT_CONFIG_FILE = 'sms.ini'
+
+# Settings understood in the [database] section of the config file. Each can
+# also be set through an environment variable, e.g. SMS_DATABASE_URL or
+# SMS_POOL_SIZE, which takes precedence over the file.
+DEFAULT_SETTINGS = {
+    'database_url': DEFAULT_DATABASE_URL,
+    'echo': 'false',
+    # Connection pool sizing, only used for server databases
+    'pool_size': '5',
+    'max_overflow': '10',
+    'pool_timeout': '30',
+    'pool_recycle': '1800',
+    'pool_pre_ping': 'true',
+    # SQLite tuning applied to every new connection
+    'sqlite_journal_mode': 'WAL',
+    'sqlite_synchronous': 'NORMAL',
+    'sqlite_mmap_size': str(256 * 1024 * 1024),
+    'sqlite_busy_timeout': '5000',
+    # Enforce foreign keys, which also makes ON DELETE CASCADE work
+    'sqlite_foreign_keys': 'ON',
+    # Write commands that hit a lock (SQLite "database is locked" once the
+    # busy timeout runs out, PostgreSQL deadlocks and serialization failures)
+    # are rolled back and retried this many times, waiting twice as long each time
+    'lock_retries': '5',
+    'lock_retry_backoff_ms': '50',
+    # Read-only commands run on a separate read-only engine: this URL (e.g. a
+    # replica), or the primary database opened read-only when empty
+    'read_database_url': '',
+    # Set to false to run every command on the primary
+    'route_reads': 'true',
+    # Seconds after a write during which reads stay on the primary, so a
+    # system sees its own writes on a lagging replica; 'inf' pins for good
+    'read_your_writes_seconds': '0',
+}
+
+
+def _as_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def load_settings(config_file=None):
+    """
+    Collect database settings from the defaults, a config file and the environment.
+
+    The config file is an INI file with a [database] section whose keys match
+    DEFAULT_SETTINGS (``url`` is accepted as a short form of ``database_url``).
+    A missing config file is not an error.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+
+    parser = configparser.ConfigParser()
+    parser.read(config_file or os.environ.get('SMS_CONFIG', DEFAULT_CONFIG_FILE))
+    if parser.has_section('database'):
+        for key, value in parser.items('database'):
+            settings['database_url' if key == 'url' else key] = value
+
+    for key in settings:
+        value = os.environ.get(f"SMS_{key.upper()}")
+        if value is not None:
+            settings[key] = value
+
+    return settings
+
+
+def get_database_url(settings=None):
+    """Return the configured database URL."""
+    settings = settings or load_settings()
+    return settings['database_url']
+
+
+def engine_options(url, settings):
+    """Build the create_engine() keyword arguments for a URL."""
+    options = {'echo': _as_bool(settings['echo'])}
+
+    # SQLite manages its own connections; pool sizing only applies to server databases
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=int(settings['pool_size']),
+            max_overflow=int(settings['max_overflow']),
+            pool_timeout=int(settings['pool_timeout']),
+            pool_recycle=int(settings['pool_recycle']),
+            pool_pre_ping=_as_bool(settings['pool_pre_ping']),
+        )
+
+    return options
+
+
+def sqlite_pragmas(settings, read_only=False):
+    """The PRAGMA statements run on every new SQLite connection, in order."""
+    pragmas = [
+        ('journal_mode', settings['sqlite_journal_mode']),
+        ('synchronous', settings['sqlite_synchronous']),
+        ('mmap_size', int(settings['sqlite_mmap_size'])),
+        ('busy_timeout', int(settings['sqlite_busy_timeout'])),
+        ('foreign_keys', settings['sqlite_foreign_keys']),
+    ]
+    # The journal mode is stored in the database file, which a read-only
+    # connection cannot change; writers set it
+    if read_only:
+        pragmas = [pragma for pragma in pragmas if pragma[0] != 'journal_mode']
+    return pragmas
+
+
+def read_only_url(url):
+    """
+    Return a URL that opens the same database without write access.
+
+    SQLite files are opened through a ``mode=ro`` URI. In-memory SQLite
+    databases and other backends are returned unchanged; see
+    create_read_only_engine for how server databases are kept read-only.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or url.query.get('uri'):
+        return url
+    return url.set(
+        database=f"file:{os.path.abspath(url.database)}",
+        query={**url.query, 'mode': 'ro', 'uri': 'true'},
+    )
+
+
+def create_engine_from_config(url=None, settings=None):
+    """
+    Create an engine for the configured database.
+
+    Server databases get a sized connection pool; SQLite connections are
+    switched to WAL mode with synchronous=NORMAL, memory-mapped I/O, a busy
+    timeout and foreign key enforcement as they are opened.
+    """
+    settings = settings or load_settings()
+    url = url or get_database_url(settings)
+    engine = create_engine(url, **engine_options(url, settings))
+
+    if engine.dialect.name == 'sqlite':
+        pragmas = sqlite_pragmas(settings, read_only=engine.url.query.get('mode') == 'ro')
+
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return engine
+
+
+def create_read_only_engine(url=None, settings=None):
+    """
+    Create an engine whose connections cannot write to the database.
+
+    SQLite files are opened read-only; PostgreSQL transactions are started
+    as READ ONLY. Other backends get an ordinary engine.
+    """
+    settings = settings or load_settings()
+    engine = create_engine_from_config(read_only_url(url or get_database_url(settings)), settings)
+    if engine.dialect.name == 'postgresql':
+        engine = engine.execution_options(postgresql_readonly=True)
+    return engine
+
+
+def get_read_database_url(settings=None):
+    """
+    Return the URL read-only commands should use, or None to keep them on the primary.
+
+    Without a read_database_url the primary is opened a second time,
+    read-only. In-memory SQLite databases cannot be opened twice, so their
+    reads always stay on the primary, as do reads of a SQLite file that does
+    not exist yet: a read-only connection cannot create it, and the primary
+    gives the usual error for a database that has not been initialised.
+    """
+    settings = settings or load_settings()
+    if not _as_bool(settings['route_reads']):
+        return None
+    if settings['read_database_url']:
+        return settings['read_database_url']
+
+    url = make_url(get_database_url(settings))
+    if url.get_backend_name() == 'sqlite' and (url.database in (None, '', ':memory:')
+                                               or not os.path.exists(url.database)):
+        return None
+    return url
+
+
+def is_lock_error(error):
+    """True for errors that mean another connection held a lock, so retrying may succeed."""
+    if not isinstance(error, OperationalError):
+        return False
+    # PostgreSQL serialization failure and deadlock
+    if getattr(error.orig, 'pgcode', None) in ('40001', '40P01'):
+        return True
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+# Guards the lazily created engines and factories below, which threads may
+# ask for at the same time
+_lock = threading.RLock()
+_engine = None
+_session_factory = None
+# False once the configuration turned out not to route reads
+_read_engine = None
+_read_session_factory = None
+
+
+def get_engine():
+    """Return the shared engine, creating it on first use."""
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = create_engine_from_config()
+    return _engine
+
+
+def get_session_factory():
+    """Return the shared sessionmaker bound to the shared engine."""
+    global _session_factory
+    with _lock:
+        if _session_factory is None:
+            _session_factory = sessionmaker(bind=get_engine())
+    return _session_factory
+
+
+def get_read_engine():
+    """Return the shared read-only engine, or None when reads stay on the primary."""
+    global _read_engine
+    with _lock:
+        if _read_engine is None:
+            settings = load_settings()
+            url = get_read_database_url(settings)
+            _read_engine = create_read_only_engine(url, settings) if url is not None else False
+    return _read_engine or None
+
+
+def get_read_session_factory():
+    """Return a sessionmaker bound to the read-only engine, or None when reads stay on the primary."""
+    global _read_session_factory
+    with _lock:
+        if _read_session_factory is None and get_read_engine() is not None:
+            _read_session_factory = sessionmaker(bind=get_read_engine())
+    return _read_session_factory
@@ -0,0 +1,48 @@
+import csv
+import json
+import sys
+from contextlib import contextmanager
+
+# Output formats understood by the export commands
+FORMATS = ('ndjson', 'csv')
+
+
+@contextmanager
+def open_output(output='-'):
+    """Open a file for writing, or hand back stdout when output is '-'."""
+    if output in (None, '-'):
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        yield f
+
+
+def write_rows(rows, f, fieldnames, file_format='ndjson'):
+    """
+    Write dict rows to an open file as NDJSON or CSV as they arrive.
+
+    Nothing is buffered beyond the current row, so memory use does not
+    depend on how many rows the iterable produces.
+
+    Returns:
+        int: The number of rows written.
+    """
+    file_format = file_format.lower()
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported export format: {file_format}")
+
+    count = 0
+    if file_format == 'csv':
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            f.write(json.dumps(row, default=str))
+            f.write('\n')
+            count += 1
+    return count
@@ -0,0 +1,80 @@
+import csv
+import json
+import os
+from itertools import islice
+
+# File extensions recognised by the bulk import commands
+FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+
+def detect_format(path, file_format=None):
+    """Work out whether a file is CSV or JSONL from its extension."""
+    if file_format:
+        file_format = file_format.lower()
+        if file_format not in ('csv', 'jsonl'):
+            raise ValueError(f"Unsupported import format: {file_format}")
+        return file_format
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; use a .csv or .jsonl file.")
+    return FORMATS[extension]
+
+
+def iter_rows(path, file_format=None):
+    """
+    Yield (line_number, row) pairs from a CSV or JSONL file one row at a time.
+
+    Line numbers match what an editor shows, so the header of a CSV file is
+    line 1 and its first data row is line 2. Blank lines are skipped.
+    """
+    file_format = detect_format(path, file_format)
+
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Strip surrounding whitespace and treat empty cells as missing
+                yield reader.line_num, {
+                    key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                    for key, value in row.items() if key is not None
+                }
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, ValueError(f"Invalid JSON: {e}")
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, ValueError("Expected a JSON object.")
+                    continue
+                yield line_number, row
+
+
+def iter_chunks(path, chunk_size=1000, file_format=None):
+    """Yield lists of at most chunk_size (line_number, row) pairs."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    rows = iter_rows(path, file_format)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def first_value(row, *keys):
+    """Return the first non-empty value found under any of the given keys."""
+    for key in keys:
+        value = row.get(key)
+        if value is not None and value != '':
+            return value
+    return None
@@ -1,37 +1,267 @@
-
-import fire
+import functools
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import desc
-from sqlalchemy.orm import joinedload
-from .models import Base, Student, Course, PerformanceRecord, Enrollment
+from sqlalchemy import bindparam, delete, func, insert, literal_column, or_, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import scoped_session
+from .cache import LRUCache
+from .db import get_session_factory, get_read_session_factory, is_lock_error, load_settings
+from .models import Base, Student, Course, PerformanceRecord, Enrollment, CourseStats, AttendanceLog, grade_to_points
+from .models import SEARCH_COLUMNS, students_fts, courses_fts, sqlite_trigram_available
+
+# Nothing here touches the database at import time. The engine and session are
+# created the first time a command needs them, the schema is created by the
+# explicit init_db command, and modules only some commands use (fire, the
+# import/export helpers) are imported where they are needed.
+
+# Snapshot of a course row kept in the course cache. Unlike an ORM object it
+# stays valid after the session that loaded it commits or closes.
+CourseInfo = namedtuple('CourseInfo', ['id', 'course_code', 'course_name', 'instructor', 'start_date', 'end_date'])
+
+
+class _CommandState(threading.local):
+    """State of the command a thread is running; every thread sees its own values."""
+    # The read session while a read-only command runs
+    reading = None
+    # When set, commands flush instead of committing so a caller can
+    # commit (or roll back) a whole group of them at once
+    defer_commit = False
+    # Reads stay on the primary until this time.monotonic() value after a write
+    pinned_until = 0.0
+
 
-# Define the database URL
-database_url = 'sqlite:///student_management.db'
+def _read_only(method):
+    """
+    Run a command that only reads on the read session.
 
-# Create the database engine
-engine = create_engine(database_url)
+    While the command runs, ``self.session`` is the read session, so helpers
+    such as _find_course follow it. The read transaction is ended afterwards
+    so the next command sees rows committed in the meantime. Generator
+    commands are not routed: they would run after this wrapper returned.
+    """
+    @functools.wraps(method)
+    def command(self, *args, **kwargs):
+        read_session = self.read_session
+        if self._state.reading is not None or read_session is self.session:
+            return method(self, *args, **kwargs)
 
-# Create tables in the database based on the models
-Base.metadata.create_all(engine)
+        self._state.reading = read_session
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._state.reading = None
+            read_session.rollback()
 
-# Create a session to interact with the database
-Session = sessionmaker(bind=engine)
-session = Session()
+    return command
+
+
+def _retry_on_lock(method):
+    """
+    Run a write command again when it failed on a lock held by another connection.
+
+    The session is rolled back and the command retried after a pause that
+    doubles each time (with jitter, so competing writers spread out), up to
+    ``lock_retries`` times. Commands inside transaction() are not retried,
+    since the earlier commands of the block were rolled back with them.
+    """
+    @functools.wraps(method)
+    def command(self, *args, **kwargs):
+        return self._call_with_lock_retries(lambda: method(self, *args, **kwargs))
+
+    return command
 
 
 class StudentManagementSystem:
-    def __init__(self):
-        self.session = session
+    def __init__(self, session=None, course_cache=None, course_cache_size: int = 256, course_cache_ttl=None,
+                 read_session=None, read_your_writes_seconds=None, lock_retries=None, lock_retry_backoff_ms=None):
+        # A session passed in is used by every thread. Without one, each
+        # thread gets its own session from a scoped_session registry, and
+        # reads are routed to a read-only engine when one is configured
+        self._session = session
+        self._read_session = read_session
+        self._sessions = None
+        self._read_sessions = None
+        self._registry_lock = threading.Lock()
+        self._state = _CommandState()
+        # None means "read from the settings when first needed"
+        self._read_your_writes_seconds = read_your_writes_seconds
+        self._lock_retries = lock_retries
+        self._lock_retry_backoff_ms = lock_retry_backoff_ms
+        # course_code -> CourseInfo; may be shared between instances
+        self.course_cache = course_cache if course_cache is not None else LRUCache(course_cache_size, course_cache_ttl)
+
+    def _registry(self, name, factory):
+        # Create a per-thread session registry on first use
+        if getattr(self, name) is None:
+            with self._registry_lock:
+                if getattr(self, name) is None:
+                    setattr(self, name, scoped_session(factory()))
+        return getattr(self, name)
+
+    @property
+    def session(self):
+        """
+        The session used by every command, opened on first use.
+
+        Unless a session was passed in, this is the calling thread's own
+        session, so one system can be shared by a pool of threads.
+        """
+        if self._state.reading is not None:
+            return self._state.reading
+        if self._session is not None:
+            return self._session
+        return self._registry('_sessions', get_session_factory)()
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    @property
+    def read_session(self):
+        """
+        The session read-only commands run on.
+
+        A session on the read-only engine (a replica, or the primary opened
+        read-only) when routing is configured, otherwise the primary session.
+        Reads also stay on the primary while commits are deferred, and for
+        ``read_your_writes_seconds`` after a write.
+        """
+        if self._state.defer_commit or time.monotonic() < self._state.pinned_until:
+            return self.session
+        if self._read_session is not None:
+            return self._read_session
+        if self._session is None and get_read_session_factory() is not None:
+            return self._registry('_read_sessions', get_read_session_factory)()
+        return self.session
+
+    def close_sessions(self):
+        """Close the sessions this system opened for the calling thread."""
+        for registry in (self._sessions, self._read_sessions):
+            if registry is not None:
+                registry.remove()
 
+    def _commit(self):
+        """Commit the current command, unless commits are being deferred."""
+        if self._state.defer_commit:
+            self.session.flush()
+        else:
+            self.session.commit()
+        self._pin_reads()
+
+    def _pin_reads(self):
+        # Keep reads on the primary for a while after a write
+        if self._read_session is None and self._session is not None:
+            return
+        if self._read_your_writes_seconds is None:
+            self._read_your_writes_seconds = float(load_settings()['read_your_writes_seconds'])
+        if self._read_your_writes_seconds > 0:
+            self._state.pinned_until = time.monotonic() + self._read_your_writes_seconds
+
+    def _lock_retry_settings(self):
+        if self._lock_retries is None or self._lock_retry_backoff_ms is None:
+            settings = load_settings()
+            if self._lock_retries is None:
+                self._lock_retries = int(settings['lock_retries'])
+            if self._lock_retry_backoff_ms is None:
+                self._lock_retry_backoff_ms = float(settings['lock_retry_backoff_ms'])
+        return self._lock_retries, self._lock_retry_backoff_ms
+
+    def _call_with_lock_retries(self, call):
+        """Call ``call()`` until it succeeds or fails on something other than a lock; see _retry_on_lock."""
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except OperationalError as e:
+                retries, backoff_ms = self._lock_retry_settings()
+                if not is_lock_error(e) or self._state.defer_commit or attempt >= retries:
+                    raise
+                self._rollback()
+                time.sleep(backoff_ms / 1000 * 2 ** attempt * random.uniform(0.5, 1.5))
+                attempt += 1
+
+    def _rollback(self):
+        """Roll back the session and forget courses it may have cached."""
+        self.session.rollback()
+        self.course_cache.clear()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a group of commands as one database transaction.
+
+            with sms.transaction():
+                for student_id, grade in grades:
+                    sms.add_performance_record(student_id, "MATH101", grade)
+
+        Commands inside the block only flush, so later ones see earlier
+        changes. Everything is committed once when the block ends, or rolled
+        back if it raises. A nested block joins the outer transaction.
+        """
+        if self._state.defer_commit:
+            yield self
+            return
+
+        self._state.defer_commit = True
+        try:
+            yield self
+            self.session.commit()
+        except BaseException:
+            self._rollback()
+            raise
+        finally:
+            self._state.defer_commit = False
+        self._pin_reads()
+
+    def _find_course(self, course_code):
+        """Look up a course by code through the course cache, or None if it does not exist."""
+        info = self.course_cache.get(course_code)
+        if info is None:
+            course = self.session.query(Course).filter_by(course_code=course_code).first()
+            if course is None:
+                return None
+            info = CourseInfo(course.id, course.course_code, course.course_name,
+                              course.instructor, course.start_date, course.end_date)
+            self.course_cache.set(course_code, info)
+        return info
+
+    def _load_course(self, course_code):
+        """Load a Course object for changing it, using the cached ID where possible."""
+        info = self._find_course(course_code)
+        if info is None:
+            return None
+
+        course = self.session.get(Course, info.id)
+        if course is None or course.course_code != course_code:
+            # The cached entry is stale, so ask the database directly
+            self.course_cache.invalidate(course_code)
+            course = self.session.query(Course).filter_by(course_code=course_code).first()
+        return course
+
+    def cache_stats(self):
+        """Return hit and miss counters for the course cache."""
+        return self.course_cache.stats()
+
+    def init_db(self):
+        """Create any missing tables in the configured database."""
+        engine = self.session.get_bind()
+        Base.metadata.create_all(engine)
+        print(f"Initialized database: {engine.url.render_as_string(hide_password=True)}")
+
+    @_retry_on_lock
     def add_student(self, name: str, email: str, age: int):
         """Add a new student to the database."""
         new_student = Student(student_name=name, student_email=email, age=age)
         self.session.add(new_student)
-        self.session.commit()
+        self._commit()
         print(f"Added student: {new_student.student_name} (ID: {new_student.id}, Email: {new_student.student_email}, Age: {age})")
 
+    @_retry_on_lock
     def add_course(self, course_name: str, course_code: str, instructor: str, start_date, end_date):
         """Add a new course to the database."""
         # Convert date strings to date objects
@@ -46,14 +276,15 @@ class StudentManagementSystem:
             end_date=end_date
         )
         self.session.add(new_course)
-        self.session.commit()
+        self._commit()
         print(f"Added course: {course_name} (Code: {course_code}, Instructor: {instructor}, Start Date: {start_date}, End Date: {end_date})")
 
+    @_retry_on_lock
     def add_performance_record(self, student_id, course_code, grade):
         """Add a performance record for a student in a course."""
         # Retrieve the student and course based on student_id and course_code
         student = self.session.query(Student).filter_by(id=student_id).first()
-        course = self.session.query(Course).filter_by(course_code=course_code).first()
+        course = self._find_course(course_code)
 
         if student is None:
             print(f"Student with ID {student_id} not found.")
@@ -68,9 +299,50 @@ class StudentManagementSystem:
         self.session.add(new_performance_record)
 
         # Commit the changes to the database
-        self.session.commit()
+        self._commit()
         print(f"Added performance record: Student ID: {student_id}, Course Code: {course_code}, Grade: {grade}")
 
+    @_retry_on_lock
+    def upsert_student(self, name: str, email: str, age=None):
+        """
+        Add a student, or update the name and age of the student with this email.
+
+        Needs SQLite, PostgreSQL or MySQL/MariaDB; other databases raise ValueError.
+        """
+        self.session.execute(
+            _upsert_students(self.session),
+            {"student_name": name, "student_email": email, "age": age},
+        )
+        self._commit()
+        print(f"Upserted student: {name} (Email: {email}, Age: {age})")
+
+    @_retry_on_lock
+    def upsert_performance_record(self, student_id, course_code, grade):
+        """
+        Add a performance record, or update the grade of the student's existing record in the course.
+
+        Needs SQLite, PostgreSQL or MySQL/MariaDB; other databases raise ValueError.
+        """
+        student = self.session.get(Student, student_id)
+        course = self._find_course(course_code)
+
+        if student is None:
+            print(f"Student with ID {student_id} not found.")
+            return
+
+        if course is None:
+            print(f"Course with code {course_code} not found.")
+            return
+
+        self.session.execute(
+            _upsert_performance_records(self.session),
+            {"student_id": student_id, "course_id": course.id, "grade": grade,
+             "grade_points": grade_to_points(grade), "_num_days_present": 0},
+        )
+        self._commit()
+        print(f"Upserted performance record: Student ID: {student_id}, Course Code: {course_code}, Grade: {grade}")
+
+    @_retry_on_lock
     def update_student(self, id, new_name: str):
         """Update student information."""
         student = self.session.query(Student).filter_by(id=id).first()
@@ -80,12 +352,13 @@ class StudentManagementSystem:
             return
 
         student.student_name = new_name
-        self.session.commit()
+        self._commit()
         print(f"Updated student information: Student ID: {id}, New Name: {new_name}")
 
+    @_retry_on_lock
     def update_course(self, course_code: str, new_course_name: str, new_course_code: str):
         """Update course information."""
-        course = self.session.query(Course).filter_by(course_code=course_code).first()
+        course = self._load_course(course_code)
 
         if course is None:
             print(f"Course with code {course_code} not found.")
@@ -93,9 +366,12 @@ class StudentManagementSystem:
 
         course.course_name = new_course_name
         course.course_code = new_course_code
-        self.session.commit()
+        self._commit()
+        self.course_cache.invalidate(course_code)
+        self.course_cache.invalidate(new_course_code)
         print(f"Updated course information: Course Code: {new_course_code}, New Course Name: {new_course_name}")
 
+    @_retry_on_lock
     def delete_student(self, id):
         """Delete a student."""
         student = self.session.query(Student).filter_by(id=id).first()
@@ -105,53 +381,220 @@ class StudentManagementSystem:
             return
 
         self.session.delete(student)
-        self.session.commit()
+        self._commit()
         print(f"Deleted student: Student ID: {id}")
 
+    @_retry_on_lock
     def delete_course(self, course_code: str):
         """Delete a course."""
-        course = self.session.query(Course).filter_by(course_code=course_code).first()
+        course = self._load_course(course_code)
 
         if course is None:
             print(f"Course with code {course_code} not found.")
             return
 
         self.session.delete(course)
-        self.session.commit()
+        self._commit()
+        self.course_cache.invalidate(course_code)
         print(f"Deleted course: Course Code: {course_code}")
 
-    def get_student_info(self, student_id):
-        # Query the database to get the student by ID
-        student = self.session.query(Student).filter_by(id=student_id).first()
+    @_retry_on_lock
+    def delete_students(self, student_ids=None, created_before=None):
+        """
+        Delete many students with a few set-based statements.
 
-        if student is None:
-            return f"Student with ID {student_id} not found."
+        Their performance records, enrollments and attendance log rows are
+        removed by the database through ON DELETE CASCADE, so nothing is
+        loaded into the session. At least one filter is required.
 
-        # Fetch the student's courses and grades using a join
-        student_courses = (
-            self.session.query(Course, PerformanceRecord)
-            .filter(PerformanceRecord.student_id == student.id)
-            .join(Course, Course.id == PerformanceRecord.course_id)
-            .all()
+        Args:
+            student_ids: Student IDs, as a list or a comma-separated string.
+            created_before (str): Only students created before this date (YYYY-MM-DD).
+
+        Returns:
+            dict: Rows deleted per table.
+        """
+        conditions = []
+        if student_ids is not None:
+            conditions.append(Student.id.in_(_as_id_list(student_ids)))
+        if created_before is not None:
+            conditions.append(Student.created_at < _parse_date(created_before))
+        if not conditions:
+            raise ValueError("Give student_ids or created_before to choose the students to delete.")
+
+        students = select(Student.id).where(*conditions)
+        counts = self._count_dependents(
+            [(PerformanceRecord, PerformanceRecord.student_id), (Enrollment, Enrollment.student_id),
+             (AttendanceLog, AttendanceLog.student_id)],
+            students,
         )
+        counts["students"] = self.session.execute(
+            delete(Student).where(*conditions).execution_options(synchronize_session=False)
+        ).rowcount
+        self._commit()
+
+        print(f"Deleted {counts['students']} students.")
+        return counts
+
+    @_retry_on_lock
+    def delete_courses(self, course_codes=None, ended_before=None):
+        """
+        Delete many courses with a few set-based statements.
+
+        Their performance records, enrollments, attendance log and course
+        stats rows are removed through ON DELETE CASCADE. At least one filter
+        is required.
 
-        # Format the result with student information
-        student_info = (
-            f"Student Information:\n"
-            f"Name: {student.student_name}\n"
-            f"Student ID: {student.id}\n"
-            f"Email: {student.student_email}\n"
-            f"Age: {student.age}\n"
+        Args:
+            course_codes: Course codes, as a list or a comma-separated string.
+            ended_before (str): Only courses whose end date is before this date (YYYY-MM-DD).
+
+        Returns:
+            dict: Rows deleted per table.
+        """
+        conditions = []
+        if course_codes is not None:
+            if isinstance(course_codes, str):
+                course_codes = [code.strip() for code in course_codes.split(',') if code.strip()]
+            conditions.append(Course.course_code.in_([str(code) for code in course_codes]))
+        if ended_before is not None:
+            conditions.append(Course.end_date < _parse_date(ended_before))
+        if not conditions:
+            raise ValueError("Give course_codes or ended_before to choose the courses to delete.")
+
+        courses = select(Course.id).where(*conditions)
+        counts = self._count_dependents(
+            [(PerformanceRecord, PerformanceRecord.course_id), (Enrollment, Enrollment.course_id),
+             (AttendanceLog, AttendanceLog.course_id), (CourseStats, CourseStats.course_id)],
+            courses,
         )
+        counts["courses"] = self.session.execute(
+            delete(Course).where(*conditions).execution_options(synchronize_session=False)
+        ).rowcount
+        self._commit()
+        # Which codes were deleted is not known without another query
+        self.course_cache.clear()
 
-        # Check if the student has enrolled in any courses
-        if student_courses:
-            student_info += "Courses Enrolled:\n"
-            for course, grade in student_courses:
-                student_info += f"- {course.course_name} (Code: {course.course_code}), Grade: {grade.grade}\n"
+        print(f"Deleted {counts['courses']} courses.")
+        return counts
+
+    def _count_dependents(self, dependents, parents):
+        """Count the rows of each (model, foreign key column) that refer to the selected parents."""
+        return {
+            model.__tablename__: self.session.scalar(
+                select(func.count()).select_from(model).where(column.in_(parents))
+            )
+            for model, column in dependents
+        }
+
+    @_read_only
+    def get_student_info(self, student_id):
+        # Load the student, their courses and grades in two queries
+        student_infos = self.get_student_infos([student_id])
+
+        if not student_infos:
+            return f"Student with ID {student_id} not found."
 
-        return student_info
+        return student_infos[0]["transcript"]
 
+    @_read_only
+    def get_student_infos(self, student_ids, batch_size: int = 500):
+        """
+        Get information about many students, including their courses and grades.
+
+        Students are loaded ``batch_size`` IDs at a time with one query for the
+        students and one for their courses and grades, so the number of queries
+        depends only on the number of batches. Unknown IDs are left out.
+
+        Returns:
+            list: One dict per student, in the order of ``student_ids``, with
+                  student_id, name, email, age, courses and the formatted
+                  transcript text.
+        """
+        return list(self._iter_student_infos(_as_id_list(student_ids), batch_size))
+
+    @_read_only
+    def export_transcripts(self, student_ids=None, course_code=None, output='-', file_format='text',
+                           batch_size: int = 500):
+        """
+        Write transcripts for a group of students to stdout or a file.
+
+        Args:
+            student_ids: The students to export.
+            course_code (str): Export every student with a record in this course instead.
+            output (str): A file path, or '-' for stdout.
+            file_format (str): 'text' for formatted transcripts or 'ndjson' for structured data.
+            batch_size (int): How many students to load per pair of queries.
+        """
+        from .exporter import open_output, write_rows
+
+        if file_format not in ('text', 'ndjson'):
+            raise ValueError(f"Unsupported transcript format: {file_format}")
+
+        if course_code is not None:
+            course = self._find_course(course_code)
+            if course is None:
+                return f"Course with code {course_code} is not found."
+            student_ids = self.session.scalars(
+                select(PerformanceRecord.student_id).where(PerformanceRecord.course_id == course.id)
+                .distinct().order_by(PerformanceRecord.student_id)
+            ).all()
+        elif student_ids is None:
+            return "Pass student_ids or course_code."
+
+        student_infos = self._iter_student_infos(_as_id_list(student_ids), batch_size)
+
+        with open_output(output) as f:
+            if file_format == 'text':
+                count = 0
+                for student_info in student_infos:
+                    f.write(student_info["transcript"])
+                    f.write("\n")
+                    count += 1
+            else:
+                count = write_rows(student_infos, f, fieldnames=None, file_format=file_format)
+
+        if output not in (None, '-'):
+            print(f"Exported {count} transcripts to {output}")
+
+    def _iter_student_infos(self, student_ids, batch_size):
+        """Yield student info dicts, loading batch_size students per pair of queries."""
+        for i in range(0, len(student_ids), batch_size):
+            batch = student_ids[i:i + batch_size]
+
+            students = {
+                student.id: student
+                for student in self.session.execute(
+                    select(Student.id, Student.student_name, Student.student_email, Student.age)
+                    .where(Student.id.in_(batch))
+                )
+            }
+
+            # Fetch every student's courses and grades using a single join
+            courses = {student_id: [] for student_id in students}
+            for student_id, course_name, course_code, grade in self.session.execute(
+                select(PerformanceRecord.student_id, Course.course_name, Course.course_code, PerformanceRecord.grade)
+                .join(Course, Course.id == PerformanceRecord.course_id)
+                .where(PerformanceRecord.student_id.in_(list(students)))
+                .order_by(PerformanceRecord.student_id, PerformanceRecord.id)
+            ):
+                courses[student_id].append({"course_name": course_name, "course_code": course_code, "grade": grade})
+
+            for student_id in batch:
+                student = students.get(student_id)
+                if student is None:
+                    continue
+                student_info = {
+                    "student_id": student.id,
+                    "name": student.student_name,
+                    "email": student.student_email,
+                    "age": student.age,
+                    "courses": courses[student.id],
+                }
+                student_info["transcript"] = _format_transcript(student_info)
+                yield student_info
+
+    @_read_only
     def get_course_info(self, course_code):
         """
         Get course information based on course code.
@@ -162,7 +605,7 @@ class StudentManagementSystem:
         Returns:
             str: A formatted string with course information.
         """
-        course = self.session.query(Course).filter_by(course_code=course_code).first()
+        course = self._find_course(course_code)
 
         if course is None:
             return f"Course with code {course_code} is not found."
@@ -177,53 +620,1064 @@ class StudentManagementSystem:
         )
         return course_info
 
+    @_read_only
     def get_performance_records(self, course_code):
-        # Query the course by its course_code
-        course = self.session.query(Course).filter_by(course_code=course_code).first()
+        # Look up the course by its course_code
+        course = self._find_course(course_code)
 
         if not course:
             return f"Course with code {course_code} is not found."
 
-        # Query the performance records for the course, including student names and IDs
-        records = self.session.query(PerformanceRecord, Student).\
-            join(Student).filter(PerformanceRecord.course_id == course.id).all()
+        # Query the performance records for the course, including student names, IDs
+        # and attendance, in a single statement
+        records = self.session.execute(
+            select(Student.id, Student.student_name, PerformanceRecord.attendance, PerformanceRecord.grade)
+            .select_from(PerformanceRecord)
+            .join(Student, Student.id == PerformanceRecord.student_id)
+            .where(PerformanceRecord.course_id == course.id)
+            .order_by(PerformanceRecord.student_id, PerformanceRecord.id)
+        ).all()
 
         # Prepare the results as a list of dictionaries
         performance_data = []
-        for record, student in records:
+        for student_id, student_name, attendance, grade in records:
             performance_data.append({
-                "student_id": student.id,
-                "student_name": student.student_name,
-                "attendance": record.attendance,  
-                "grade": record.grade
+                "student_id": student_id,
+                "student_name": student_name,
+                "attendance": attendance,
+                "grade": grade
             })
 
         return performance_data
 
-    def rank_students(self, course_code):
+    def iter_performance_records(self, course_code, batch_size: int = 1000):
+        """
+        Yield the performance records of a course one dict at a time.
+
+        Rows are fetched from the database in batches of ``batch_size``
+        (server-side cursors where the driver supports them), so memory use
+        stays flat however large the course is. Yields nothing if the course
+        does not exist.
+        """
+        course = self._find_course(course_code)
+        if course is None:
+            return
+
+        statement = (
+            select(Student.id, Student.student_name, PerformanceRecord.attendance, PerformanceRecord.grade)
+            .select_from(PerformanceRecord)
+            .join(Student, Student.id == PerformanceRecord.student_id)
+            .where(PerformanceRecord.course_id == course.id)
+            .order_by(PerformanceRecord.student_id, PerformanceRecord.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        for student_id, student_name, attendance, grade in self.session.execute(statement):
+            yield {
+                "student_id": student_id,
+                "student_name": student_name,
+                "attendance": attendance,
+                "grade": grade,
+            }
+
+    @_read_only
+    def export_performance_records(self, course_code, output='-', file_format='ndjson', batch_size: int = 1000):
+        """
+        Stream the performance records of a course to stdout or a file.
+
+        Args:
+            course_code (str): The course to export.
+            output (str): A file path, or '-' for stdout.
+            file_format (str): Either 'ndjson' or 'csv'.
+            batch_size (int): How many rows to fetch from the database at a time.
+        """
+        from .exporter import open_output, write_rows
+
+        if self._find_course(course_code) is None:
+            return f"Course with code {course_code} is not found."
+
+        with open_output(output) as f:
+            count = write_rows(
+                self.iter_performance_records(course_code, batch_size),
+                f,
+                fieldnames=["student_id", "student_name", "attendance", "grade"],
+                file_format=file_format,
+            )
+
+        if output not in (None, '-'):
+            print(f"Exported {count} performance records for {course_code} to {output}")
+
+    @_read_only
+    def list_students(self, limit: int = 50, after=None, min_age=None, max_age=None):
+        """
+        List students in ID order, a page at a time.
+
+        Pages are read with keyset pagination: pass the ``next_cursor`` of
+        one page as ``after`` to get the next, which costs the same however
+        far into the list it is.
+
+        Args:
+            limit (int): Students per page.
+            after (int): ``next_cursor`` from the previous page.
+            min_age (int): Only students at least this old.
+            max_age (int): Only students at most this old.
+
+        Returns:
+            dict: ``{"students": [dict], "next_cursor": int or None}``; the
+                  cursor is None on the last page.
+        """
+        statement = select(Student.id, Student.student_name, Student.student_email, Student.age)
+        if min_age is not None:
+            statement = statement.where(Student.age >= min_age)
+        if max_age is not None:
+            statement = statement.where(Student.age <= max_age)
+
+        rows, next_cursor = self._page(statement, Student.id, limit, after)
+        return {
+            "students": [
+                {"student_id": student_id, "name": name, "email": email, "age": age}
+                for student_id, name, email, age in rows
+            ],
+            "next_cursor": next_cursor,
+        }
+
+    @_read_only
+    def list_courses(self, limit: int = 50, after=None, instructor=None, active_from=None, active_until=None):
         """
-        Rank students in descending order based on their grade in a specific course.
+        List courses in ID order, a page at a time.
+
+        Args:
+            limit (int): Courses per page.
+            after (int): ``next_cursor`` from the previous page.
+            instructor (str): Only courses taught by this instructor.
+            active_from (str): Only courses still running on or after this date (YYYY-MM-DD).
+            active_until (str): Only courses that have started by this date (YYYY-MM-DD).
+
+        Returns:
+            dict: ``{"courses": [dict], "next_cursor": int or None}``
+        """
+        statement = select(Course.id, Course.course_code, Course.course_name, Course.instructor,
+                           Course.start_date, Course.end_date)
+        if instructor is not None:
+            statement = statement.where(Course.instructor == instructor)
+        if active_from is not None:
+            statement = statement.where(Course.end_date >= _parse_date(active_from))
+        if active_until is not None:
+            statement = statement.where(Course.start_date <= _parse_date(active_until))
+
+        rows, next_cursor = self._page(statement, Course.id, limit, after)
+        return {
+            "courses": [
+                {"course_id": course_id, "course_code": course_code, "course_name": course_name,
+                 "instructor": instructor, "start_date": start_date, "end_date": end_date}
+                for course_id, course_code, course_name, instructor, start_date, end_date in rows
+            ],
+            "next_cursor": next_cursor,
+        }
+
+    @_read_only
+    def list_performance_records(self, limit: int = 50, after=None, course_code=None, student_id=None, grade=None):
+        """
+        List performance records in ID order, a page at a time.
+
+        Args:
+            limit (int): Records per page.
+            after (int): ``next_cursor`` from the previous page.
+            course_code (str): Only records in this course.
+            student_id (int): Only records of this student.
+            grade: Only records with this grade, or any of several grades
+                   given as a list or comma-separated string.
+
+        Returns:
+            dict: ``{"records": [dict], "next_cursor": int or None}``
+        """
+        statement = (
+            select(PerformanceRecord.id, PerformanceRecord.student_id, Course.course_code,
+                   PerformanceRecord.grade, PerformanceRecord.grade_points, PerformanceRecord._num_days_present)
+            .join(Course, Course.id == PerformanceRecord.course_id)
+        )
+        if course_code is not None:
+            course = self._find_course(course_code)
+            if not course:
+                return f"Course with code {course_code} is not found."
+            statement = statement.where(PerformanceRecord.course_id == course.id)
+        if student_id is not None:
+            statement = statement.where(PerformanceRecord.student_id == student_id)
+        if grade is not None:
+            grades = grade.split(',') if isinstance(grade, str) else grade
+            statement = statement.where(PerformanceRecord.grade.in_([str(g).strip() for g in grades]))
+
+        rows, next_cursor = self._page(statement, PerformanceRecord.id, limit, after)
+        return {
+            "records": [
+                {"record_id": record_id, "student_id": record_student_id, "course_code": record_course_code,
+                 "grade": record_grade, "grade_points": grade_points, "num_days_present": num_days_present}
+                for record_id, record_student_id, record_course_code, record_grade, grade_points, num_days_present in rows
+            ],
+            "next_cursor": next_cursor,
+        }
+
+    def _page(self, statement, key, limit, after):
+        """
+        Run one page of a keyset-paginated query ordered by ``key``, which
+        must be the first column the statement selects.
+
+        Fetches one row more than the page holds to find out whether there is
+        a next page, and returns (rows, next_cursor).
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1.")
+        if after is not None:
+            statement = statement.where(key > after)
+
+        rows = self.session.execute(statement.order_by(key).limit(limit + 1)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, rows[-1][0]
+        return rows, None
+
+    @_read_only
+    def search(self, query: str, limit: int = 10, scope: str = 'all'):
+        """
+        Find students by partial name or email and courses by partial code, name or instructor.
+
+        On SQLite the FTS5 trigram indexes answer the search and results are
+        ranked by bm25; on PostgreSQL trigram indexes serve an ILIKE search
+        ranked by similarity. Every word of the query must appear somewhere
+        in a matching row.
+
+        Args:
+            query (str): Words or fragments of at least three characters each.
+            limit (int): Most results per kind.
+            scope (str): 'all', 'students' or 'courses'.
+
+        Returns:
+            dict: ``{"students": [dict], "courses": [dict]}`` best match first,
+                  each dict with a ``score`` (higher is better).
+        """
+        if scope not in ('all', 'students', 'courses'):
+            raise ValueError(f"Unknown search scope: {scope}")
+        terms = str(query).split()
+        if not terms or any(len(term) < 3 for term in terms):
+            return "Search terms need at least 3 characters each."
+
+        results = {}
+        if scope in ('all', 'students'):
+            rows = self.session.execute(self._search_statement(
+                select(Student.id, Student.student_name, Student.student_email),
+                Student.__table__, students_fts, terms, limit,
+            )).all()
+            results["students"] = [
+                {"student_id": student_id, "name": name, "email": email, "score": score}
+                for student_id, name, email, score in rows
+            ]
+        if scope in ('all', 'courses'):
+            rows = self.session.execute(self._search_statement(
+                select(Course.course_code, Course.course_name, Course.instructor),
+                Course.__table__, courses_fts, terms, limit,
+            )).all()
+            results["courses"] = [
+                {"course_code": course_code, "course_name": course_name, "instructor": instructor, "score": score}
+                for course_code, course_name, instructor, score in rows
+            ]
+        return results
+
+    def _search_statement(self, statement, table, fts, terms, limit):
+        """Add the search condition, a score column and ordering to a select over a searchable table."""
+        dialect = self.session.get_bind().dialect.name
+
+        if dialect == 'sqlite' and sqlite_trigram_available(self.session.connection()):
+            # Quote every term so FTS5 reads it as text, not query syntax; bm25 is lower for better matches
+            match = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+            score = -func.bm25(literal_column(fts.name))
+            return (
+                statement.add_columns(score.label('score'))
+                .join(fts, literal_column(f"{fts.name}.rowid") == table.c.id)
+                .where(literal_column(fts.name).op('MATCH')(match))
+                .order_by(score.desc(), table.c.id)
+                .limit(limit)
+            )
+
+        columns = [table.c[name] for name in SEARCH_COLUMNS[table.name]]
+        for term in terms:
+            statement = statement.where(or_(*(column.icontains(term, autoescape=True) for column in columns)))
+        if dialect == 'postgresql':
+            score = func.greatest(*(func.similarity(column, ' '.join(terms)) for column in columns))
+            order = (score.desc(), table.c.id)
+        else:
+            # No relevance score here; a constant ORDER BY 0 would also read as a column position
+            score = literal_column('0')
+            order = (table.c.id,)
+        return statement.add_columns(score.label('score')).order_by(*order).limit(limit)
+
+    @_read_only
+    def get_low_attendance(self, course_code, threshold: float = 75):
+        """
+        List the students of a course whose attendance is below a threshold.
+
+        Args:
+            course_code (str): The course to check.
+            threshold (float): Attendance percentage to compare against.
+
+        Returns:
+            list: Dictionaries of student_id, student_name and attendance,
+                  lowest attendance first.
+        """
+        records = self.session.execute(
+            select(Student.id, Student.student_name, PerformanceRecord.attendance)
+            .select_from(PerformanceRecord)
+            .join(Student, Student.id == PerformanceRecord.student_id)
+            .join(Course, Course.id == PerformanceRecord.course_id)
+            .where(Course.course_code == course_code, PerformanceRecord.attendance < threshold)
+            .order_by(PerformanceRecord.attendance, Student.id)
+        ).all()
+
+        return [
+            {"student_id": student_id, "student_name": student_name, "attendance": attendance}
+            for student_id, student_name, attendance in records
+        ]
+
+    @_read_only
+    def rank_students(self, course_code, limit=None, after=None, dense: bool = False):
+        """
+        Rank students in descending order based on their grade points in a specific course.
+
+        Ranking runs in the database with RANK() (or DENSE_RANK()), so students
+        with the same grade share a rank. Ties are listed by student ID, which
+        also makes ``after`` usable as a cursor for the next page.
         Args:
             course_code (str): The course code for which to rank students.
+            limit (int): Only return this many rows.
+            after (int): Student ID of the last row of the previous page.
+            dense (bool): Use DENSE_RANK() so ranks have no gaps after ties.
         Returns:
-            list or str: A list of tuples containing (student_name, grade) in descending order
-                            or an error message if the course code is not found.
+            list or str: A list of tuples containing (student_name, grade, rank, student_id)
+                            in rank order or an error message if the course code is not found.
         """
         # Check if the course code exists in the database
-        course = self.session.query(Course).filter_by(course_code=course_code).first()
+        course = self._find_course(course_code)
         if not course:
             return f"Course with code {course_code} is not found."
 
+        rank_function = func.dense_rank() if dense else func.rank()
+        ranked = (
+            select(
+                Student.student_name,
+                PerformanceRecord.grade,
+                rank_function.over(order_by=PerformanceRecord.grade_points.desc().nulls_last()).label('rank'),
+                Student.id.label('student_id'),
+            )
+            .join(PerformanceRecord, Student.id == PerformanceRecord.student_id)
+            .where(PerformanceRecord.course_id == course.id)
+            .cte('ranked')
+        )
+
         # Query the database to get the ranked students
-        ranked_students = self.session.query(Student.student_name, PerformanceRecord.grade)\
-            .join(PerformanceRecord, Student.id == PerformanceRecord.student_id)\
-            .join(Course, PerformanceRecord.course_id == Course.id)\
-            .filter(Course.course_code == course_code)\
-            .order_by(desc(PerformanceRecord.grade))\
-            .all()
+        statement = select(ranked).order_by(ranked.c.rank, ranked.c.student_id)
+
+        if after is not None:
+            # Continue after the given student, whose rank is looked up in the same query
+            after_rank = select(ranked.c.rank).where(ranked.c.student_id == after).limit(1).scalar_subquery()
+            statement = statement.where(
+                (ranked.c.rank > after_rank)
+                | ((ranked.c.rank == after_rank) & (ranked.c.student_id > after))
+            )
+
+        if limit is not None:
+            statement = statement.limit(limit)
+
+        ranked_students = self.session.execute(statement).all()
 
         return ranked_students
 
+    @_read_only
+    def get_course_stats(self, course_code):
+        """
+        Summarize a course's performance records from the course_stats table.
+
+        Reads one row per grade instead of aggregating every record of the
+        course. The totals are kept current by database triggers; use
+        rebuild_course_stats if they may have drifted.
+
+        Args:
+            course_code (str): The course to summarize.
+
+        Returns:
+            dict or str: ``course_code``, ``records``, ``grades`` (record count per
+            grade, ungraded records under ``''``), ``mean_grade_points`` and
+            ``mean_attendance``, or an error message if the course is not found.
+        """
+        course = self._find_course(course_code)
+        if not course:
+            return f"Course with code {course_code} is not found."
+
+        rows = self.session.execute(
+            select(CourseStats.grade, CourseStats.record_count, CourseStats.points_count,
+                   CourseStats.grade_points_sum, CourseStats.days_present_sum)
+            .where(CourseStats.course_id == course.id)
+            .order_by(CourseStats.grade)
+        ).all()
+
+        records = sum(row.record_count for row in rows)
+        points_count = sum(row.points_count for row in rows)
+        days_present = sum(row.days_present_sum for row in rows)
+
+        # Mean attendance uses the same formula as PerformanceRecord.attendance,
+        # which counts a course without both dates as having no days
+        mean_attendance = None
+        if records:
+            total_days = 0
+            if course.start_date is not None and course.end_date is not None:
+                total_days = (course.end_date - course.start_date).days + 1
+            mean_attendance = days_present / records / total_days * 100 if total_days > 0 else 0
+
+        return {
+            "course_code": course.course_code,
+            "records": records,
+            "grades": {row.grade: row.record_count for row in rows},
+            "mean_grade_points": sum(row.grade_points_sum for row in rows) / points_count if points_count else None,
+            "mean_attendance": mean_attendance,
+        }
+
+    @_retry_on_lock
+    def rebuild_course_stats(self, course_code=None):
+        """
+        Recompute the course_stats table from the performance records.
+
+        Compares the stored totals with freshly aggregated ones, reports every
+        difference, then replaces the stored rows. Needed after loading data
+        with the triggers missing, e.g. on databases other than SQLite and
+        PostgreSQL.
+
+        Args:
+            course_code (str): Only rebuild this course; all courses by default.
+
+        Returns:
+            dict: ``{"rows": int, "drift": [{"course_id", "grade", "column", "stored", "actual"}]}``
+        """
+        grade = func.coalesce(PerformanceRecord.grade, '')
+        actual_query = (
+            select(
+                PerformanceRecord.course_id,
+                grade.label('grade'),
+                func.count().label('record_count'),
+                func.count(PerformanceRecord.grade_points).label('points_count'),
+                func.coalesce(func.sum(PerformanceRecord.grade_points), 0.0).label('grade_points_sum'),
+                func.coalesce(func.sum(PerformanceRecord._num_days_present), 0).label('days_present_sum'),
+            )
+            .group_by(PerformanceRecord.course_id, grade)
+        )
+        stored_query = select(CourseStats.__table__)
+        clear = delete(CourseStats)
+
+        if course_code is not None:
+            course = self._find_course(course_code)
+            if not course:
+                return f"Course with code {course_code} is not found."
+            actual_query = actual_query.where(PerformanceRecord.course_id == course.id)
+            stored_query = stored_query.where(CourseStats.course_id == course.id)
+            clear = clear.where(CourseStats.course_id == course.id)
+
+        actual = {(row.course_id, row.grade): row._asdict() for row in self.session.execute(actual_query)}
+        stored = {(row.course_id, row.grade): row._asdict() for row in self.session.execute(stored_query)}
+
+        drift = []
+        for key in sorted(actual.keys() | stored.keys()):
+            for column in ('record_count', 'points_count', 'grade_points_sum', 'days_present_sum'):
+                stored_value = stored.get(key, {}).get(column, 0)
+                actual_value = actual.get(key, {}).get(column, 0)
+                # Running float sums can be off by rounding error without having drifted
+                if abs(stored_value - actual_value) > 1e-6:
+                    drift.append({"course_id": key[0], "grade": key[1], "column": column,
+                                  "stored": stored_value, "actual": actual_value})
+
+        self.session.execute(clear)
+        if actual:
+            self.session.execute(insert(CourseStats.__table__), list(actual.values()))
+        self._commit()
+        return {"rows": len(actual), "drift": drift}
+
+    @_read_only
+    def analytics_snapshot(self, course_codes=None, batch_size: int = 10000):
+        """
+        Load performance records into an in-memory AnalyticsSnapshot.
+
+        The snapshot keeps grades, grade points and attendance as compact
+        columns, so percentiles, histograms and correlations over all records
+        are answered without further queries. From the CLI, chain a query
+        after a ``-``, e.g. ``analytics_snapshot - percentile attendance 10``.
+
+        Args:
+            course_codes: Only load these courses (a list or a comma-separated
+                          string); all courses by default.
+            batch_size (int): Rows fetched from the database at a time.
+
+        Returns:
+            AnalyticsSnapshot: The loaded snapshot.
+        """
+        from .analytics import AnalyticsSnapshot
+
+        course_ids = None
+        if course_codes is not None:
+            if isinstance(course_codes, str):
+                course_codes = [code.strip() for code in course_codes.split(',') if code.strip()]
+            course_ids = list(self.session.scalars(
+                select(Course.id).where(Course.course_code.in_([str(code) for code in course_codes]))
+            ))
+
+        return AnalyticsSnapshot.load(self.session, course_ids, batch_size)
+
+    def generate_reports(self, output_dir='reports', workers=None, course_codes=None):
+        """
+        Write a JSON report per course with its performance records and ranking.
+
+        Courses are spread over a pool of worker processes, each with its own
+        read-only connection, so the run scales with the number of cores.
+        Progress is printed to stderr as courses finish.
+
+        Args:
+            output_dir (str): Directory for the ``<course_code>.json`` files.
+            workers (int): Worker processes; the number of CPUs by default.
+            course_codes: Only report on these courses (a list or a
+                          comma-separated string); all courses by default.
+
+        Returns:
+            dict: ``courses``, ``records``, ``unknown_courses`` (codes skipped because
+                  the course does not exist), ``workers``, ``seconds`` and ``worker_seconds``.
+        """
+        import os
+        from .reports import generate_reports
+
+        url = self.session.get_bind().url
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            raise ValueError("generate_reports needs a database file or server; "
+                             "worker processes cannot open an in-memory database.")
+
+        if course_codes is None:
+            course_codes = list(self.session.scalars(select(Course.course_code).order_by(Course.course_code)))
+        elif isinstance(course_codes, str):
+            course_codes = [code.strip() for code in course_codes.split(',') if code.strip()]
+        else:
+            course_codes = [str(code) for code in course_codes]
+
+        return generate_reports(
+            url.render_as_string(hide_password=False),
+            course_codes,
+            output_dir,
+            workers=int(workers or os.cpu_count() or 1),
+        )
+
+    def batch(self, path='-', transaction: bool = False, stop_on_error: bool = False):
+        """
+        Run many commands in this process, one per line, from a file or stdin.
+
+        Lines use the same commands and arguments as the CLI, e.g.
+        ``add_student "Jane Smith" jane@example.com 22``. Every command shares
+        this system's session and connection.
+
+        Args:
+            path (str): File of commands, or '-' for stdin.
+            transaction (bool): Commit all commands together at the end, or
+                                roll all of them back if any command fails.
+            stop_on_error (bool): Stop at the first failing command.
+        """
+        from .batch import run_batch
+
+        if path in (None, '-'):
+            return run_batch(self, sys.stdin, transaction, stop_on_error)
+        with open(path, encoding='utf-8') as f:
+            return run_batch(self, f, transaction, stop_on_error)
+
+    def shell(self):
+        """Start an interactive prompt that runs CLI commands in this process."""
+        from .batch import run_shell
+
+        run_shell(self)
+
+    def import_students(self, path, chunk_size: int = 1000, file_format=None, upsert: bool = False):
+        """
+        Bulk import students from a CSV or JSONL file.
+
+        Rows need a name (``student_name`` or ``name``) and an email
+        (``student_email`` or ``email``); ``age`` is optional. Each chunk is
+        inserted with one batched INSERT and committed on its own. Rows that
+        fail validation are reported and skipped instead of aborting the load.
+
+        With ``upsert`` set, students whose email already exists are updated
+        in the same batched ``INSERT ... ON CONFLICT DO UPDATE`` (``ON
+        DUPLICATE KEY UPDATE`` on MySQL) instead of being reported, so a sync
+        can be re-run without checking every row. Upserts need SQLite,
+        PostgreSQL or MySQL/MariaDB; other databases raise ValueError.
+
+        Returns:
+            dict: ``{"inserted": int, "errors": [{"line": int, "error": str}]}``,
+                  where ``inserted`` includes updated rows in upsert mode
+        """
+        from .importer import iter_chunks, first_value
+
+        report = {"inserted": 0, "errors": []}
+        seen_emails = set()
+
+        for chunk in iter_chunks(path, chunk_size, file_format):
+            candidates = []
+            for line, row in chunk:
+                if isinstance(row, Exception):
+                    report["errors"].append({"line": line, "error": str(row)})
+                    continue
+
+                name = first_value(row, 'student_name', 'name')
+                email = first_value(row, 'student_email', 'email')
+                age = first_value(row, 'age')
+
+                if name is None or email is None:
+                    report["errors"].append({"line": line, "error": "Missing student name or email."})
+                    continue
+                try:
+                    age = int(age) if age is not None else None
+                except (TypeError, ValueError):
+                    report["errors"].append({"line": line, "error": f"Invalid age: {age}"})
+                    continue
+                if email in seen_emails:
+                    report["errors"].append({"line": line, "error": f"Duplicate email in file: {email}"})
+                    continue
+
+                seen_emails.add(email)
+                candidates.append((line, {"student_name": name, "student_email": email, "age": age}))
+
+            if upsert:
+                rows = [data for _, data in candidates]
+                if rows:
+                    self.session.execute(_upsert_students(self.session), rows)
+                self._commit()
+                report["inserted"] += len(rows)
+                continue
+
+            # Find the emails that are already taken with a single query per chunk
+            existing = set(self.session.scalars(
+                select(Student.student_email)
+                .where(Student.student_email.in_([data["student_email"] for _, data in candidates]))
+            ))
+
+            rows = []
+            for line, data in candidates:
+                if data["student_email"] in existing:
+                    report["errors"].append({"line": line, "error": f"Email already exists: {data['student_email']}"})
+                else:
+                    rows.append(data)
+
+            if rows:
+                self.session.execute(insert(Student.__table__), rows)
+            self._commit()
+            report["inserted"] += len(rows)
+
+        report["errors"].sort(key=lambda error: error["line"])
+        return report
+
+    def import_courses(self, path, chunk_size: int = 1000, file_format=None):
+        """
+        Bulk import courses from a CSV or JSONL file.
+
+        Rows need ``course_code`` and ``course_name``; ``instructor``,
+        ``start_date`` and ``end_date`` (YYYY-MM-DD) are optional. Duplicate
+        course codes are reported per row and skipped.
+
+        Returns:
+            dict: ``{"inserted": int, "errors": [{"line": int, "error": str}]}``
+        """
+        from .importer import iter_chunks, first_value
+
+        report = {"inserted": 0, "errors": []}
+        seen_codes = set()
+
+        for chunk in iter_chunks(path, chunk_size, file_format):
+            candidates = []
+            for line, row in chunk:
+                if isinstance(row, Exception):
+                    report["errors"].append({"line": line, "error": str(row)})
+                    continue
+
+                course_code = first_value(row, 'course_code', 'code')
+                course_name = first_value(row, 'course_name', 'name')
+
+                if course_code is None or course_name is None:
+                    report["errors"].append({"line": line, "error": "Missing course code or course name."})
+                    continue
+                try:
+                    start_date = _parse_date(first_value(row, 'start_date'))
+                    end_date = _parse_date(first_value(row, 'end_date'))
+                except ValueError as e:
+                    report["errors"].append({"line": line, "error": f"Invalid date: {e}"})
+                    continue
+                if course_code in seen_codes:
+                    report["errors"].append({"line": line, "error": f"Duplicate course code in file: {course_code}"})
+                    continue
+
+                seen_codes.add(course_code)
+                candidates.append((line, {
+                    "course_code": course_code,
+                    "course_name": course_name,
+                    "instructor": first_value(row, 'instructor'),
+                    "start_date": start_date,
+                    "end_date": end_date,
+                }))
+
+            existing = set(self.session.scalars(
+                select(Course.course_code)
+                .where(Course.course_code.in_([data["course_code"] for _, data in candidates]))
+            ))
+
+            rows = []
+            for line, data in candidates:
+                if data["course_code"] in existing:
+                    report["errors"].append({"line": line, "error": f"Course code already exists: {data['course_code']}"})
+                else:
+                    rows.append(data)
+
+            if rows:
+                self.session.execute(insert(Course.__table__), rows)
+            self._commit()
+            report["inserted"] += len(rows)
+
+        report["errors"].sort(key=lambda error: error["line"])
+        return report
+
+    def import_performance_records(self, path, chunk_size: int = 1000, file_format=None, upsert: bool = False):
+        """
+        Bulk import performance records from a CSV or JSONL file.
+
+        Rows need ``student_id``, ``course_code`` and ``grade``;
+        ``num_days_present`` is optional. Course codes and student IDs are
+        resolved with one query each per chunk, and rows pointing at unknown
+        students or courses are reported and skipped. A student can only have
+        one record per course, so repeated pairs are reported too.
+
+        With ``upsert`` set, existing records for a student and course get the
+        new grade in the same batched ``INSERT ... ON CONFLICT DO UPDATE``
+        (``ON DUPLICATE KEY UPDATE`` on MySQL) instead of being reported.
+        Their days present are kept. Upserts need SQLite, PostgreSQL or
+        MySQL/MariaDB; other databases raise ValueError.
+
+        Returns:
+            dict: ``{"inserted": int, "errors": [{"line": int, "error": str}]}``,
+                  where ``inserted`` includes updated rows in upsert mode
+        """
+        from .importer import iter_chunks, first_value
+
+        report = {"inserted": 0, "errors": []}
+        seen_pairs = set()
+
+        for chunk in iter_chunks(path, chunk_size, file_format):
+            candidates = []
+            for line, row in chunk:
+                if isinstance(row, Exception):
+                    report["errors"].append({"line": line, "error": str(row)})
+                    continue
+
+                student_id = first_value(row, 'student_id')
+                course_code = first_value(row, 'course_code')
+                num_days_present = first_value(row, 'num_days_present')
+
+                if student_id is None or course_code is None:
+                    report["errors"].append({"line": line, "error": "Missing student ID or course code."})
+                    continue
+                try:
+                    student_id = int(student_id)
+                    num_days_present = int(num_days_present) if num_days_present is not None else 0
+                except (TypeError, ValueError):
+                    report["errors"].append({"line": line, "error": "Student ID and days present must be integers."})
+                    continue
+
+                candidates.append((line, student_id, str(course_code), first_value(row, 'grade'), num_days_present))
+
+            # Resolve course codes and student IDs in bulk
+            course_ids = dict(self.session.execute(
+                select(Course.course_code, Course.id)
+                .where(Course.course_code.in_({course_code for _, _, course_code, _, _ in candidates}))
+            ).all())
+            student_ids = set(self.session.scalars(
+                select(Student.id).where(Student.id.in_({student_id for _, student_id, _, _, _ in candidates}))
+            ))
+
+            existing_pairs = set()
+            if not upsert:
+                # Filter each column on its own so the unique index is used, then match pairs in Python
+                existing_pairs = set(self.session.execute(
+                    select(PerformanceRecord.student_id, PerformanceRecord.course_id)
+                    .where(PerformanceRecord.student_id.in_(student_ids),
+                           PerformanceRecord.course_id.in_(course_ids.values()))
+                ).all())
+
+            rows = []
+            for line, student_id, course_code, grade, num_days_present in candidates:
+                if course_code not in course_ids:
+                    report["errors"].append({"line": line, "error": f"Course with code {course_code} not found."})
+                elif student_id not in student_ids:
+                    report["errors"].append({"line": line, "error": f"Student with ID {student_id} not found."})
+                elif (student_id, course_code) in seen_pairs:
+                    report["errors"].append({"line": line, "error": f"Duplicate record in file for student {student_id} in {course_code}."})
+                elif (student_id, course_ids[course_code]) in existing_pairs:
+                    report["errors"].append({"line": line, "error": f"Record already exists for student {student_id} in {course_code}."})
+                else:
+                    seen_pairs.add((student_id, course_code))
+                    rows.append({
+                        "student_id": student_id,
+                        "course_id": course_ids[course_code],
+                        "grade": grade,
+                        "grade_points": grade_to_points(grade),
+                        "_num_days_present": num_days_present,
+                    })
+
+            if rows and upsert:
+                self.session.execute(_upsert_performance_records(self.session), rows)
+            elif rows:
+                self.session.execute(insert(PerformanceRecord.__table__), rows)
+            self._commit()
+            report["inserted"] += len(rows)
+
+        report["errors"].sort(key=lambda error: error["line"])
+        return report
+
+    def ingest_attendance(self, path, chunk_size: int = 5000, file_format=None):
+        """
+        Apply a file of attendance events to the days present counters.
+
+        Rows need ``student_id``, ``course_code`` and ``date`` (YYYY-MM-DD).
+        Each (student, course, date) is counted once: duplicates within the
+        file and days already ingested by an earlier run are skipped, so
+        re-running a file changes nothing. The remaining events are sorted by
+        course and, a chunk at a time, added up per student and course and
+        applied with one batched
+        ``UPDATE ... SET _num_days_present = _num_days_present + n`` each for
+        performance records and enrollments, committed together with the log
+        of ingested days. A chunk that fails on a lock is rolled back and
+        retried on its own like a write command.
+
+        Returns:
+            dict: ``{"applied": int, "duplicates": int, "errors": [{"line": int, "error": str}]}``
+        """
+        from .importer import iter_chunks, first_value
+
+        report = {"applied": 0, "duplicates": 0, "errors": []}
+        seen = set()
+        events = []
+
+        # Read and validate the whole file first; a day's scans fit in memory
+        for chunk in iter_chunks(path, chunk_size, file_format):
+            candidates = []
+            for line, row in chunk:
+                if isinstance(row, Exception):
+                    report["errors"].append({"line": line, "error": str(row)})
+                    continue
+
+                student_id = first_value(row, 'student_id')
+                course_code = first_value(row, 'course_code')
+                day = first_value(row, 'date', 'day')
+
+                if student_id is None or course_code is None or day is None:
+                    report["errors"].append({"line": line, "error": "Missing student ID, course code or date."})
+                    continue
+                try:
+                    student_id = int(student_id)
+                    day = _parse_date(day)
+                except (TypeError, ValueError):
+                    report["errors"].append({"line": line, "error": "Student ID must be an integer and date YYYY-MM-DD."})
+                    continue
+
+                if (student_id, str(course_code), day) in seen:
+                    report["duplicates"] += 1
+                    continue
+                seen.add((student_id, str(course_code), day))
+                candidates.append((line, student_id, str(course_code), day))
+
+            course_ids = dict(self.session.execute(
+                select(Course.course_code, Course.id)
+                .where(Course.course_code.in_({course_code for _, _, course_code, _ in candidates}))
+            ).all())
+
+            for line, student_id, course_code, day in candidates:
+                if course_code not in course_ids:
+                    report["errors"].append({"line": line, "error": f"Course with code {course_code} not found."})
+                else:
+                    events.append((line, student_id, course_code, course_ids[course_code], day))
+
+        # Sorted by course, each chunk touches only a few courses, which keeps
+        # the lookups below small however the file is ordered
+        events.sort(key=lambda event: (event[3], event[1], event[4]))
+
+        increments = [
+            update(table)
+            .where(table.c.student_id == bindparam('b_student_id'), table.c.course_id == bindparam('b_course_id'))
+            .values(_num_days_present=func.coalesce(table.c._num_days_present, 0) + bindparam('b_days'))
+            for table in (PerformanceRecord.__table__, Enrollment.__table__)
+        ]
+
+        def apply_chunk(chunk):
+            # Filter on each column separately so the lookups can use the
+            # indexes (SQLite scans the table for a row-value IN), then keep
+            # the exact combinations in Python
+            student_ids = {student_id for _, student_id, _, _, _ in chunk}
+            chunk_course_ids = {course_id for _, _, _, course_id, _ in chunk}
+
+            # Only students with a record or enrollment in the course have a counter to add to
+            known_pairs = set()
+            for model in (PerformanceRecord, Enrollment):
+                known_pairs.update(self.session.execute(
+                    select(model.student_id, model.course_id)
+                    .where(model.course_id.in_(chunk_course_ids), model.student_id.in_(student_ids))
+                ).all())
+
+            # Days counted by an earlier run
+            ingested = set(self.session.execute(
+                select(AttendanceLog.student_id, AttendanceLog.course_id, AttendanceLog.day)
+                .where(
+                    AttendanceLog.course_id.in_(chunk_course_ids),
+                    AttendanceLog.student_id.in_(student_ids),
+                    AttendanceLog.day.in_({day for _, _, _, _, day in chunk}),
+                )
+            ).all())
+
+            log_rows, days, errors, duplicates = [], {}, [], 0
+            for line, student_id, course_code, course_id, day in chunk:
+                if (student_id, course_id) not in known_pairs:
+                    errors.append({
+                        "line": line,
+                        "error": f"Student with ID {student_id} is not enrolled in course {course_code}.",
+                    })
+                elif (student_id, course_id, day) in ingested:
+                    duplicates += 1
+                else:
+                    log_rows.append({"student_id": student_id, "course_id": course_id, "day": day})
+                    days[(student_id, course_id)] = days.get((student_id, course_id), 0) + 1
+
+            if log_rows:
+                self.session.execute(insert(AttendanceLog.__table__), log_rows)
+                parameters = [
+                    {"b_student_id": student_id, "b_course_id": course_id, "b_days": count}
+                    for (student_id, course_id), count in days.items()
+                ]
+                for statement in increments:
+                    self.session.execute(statement, parameters)
+            self._commit()
+            return len(log_rows), errors, duplicates
+
+        for offset in range(0, len(events), chunk_size):
+            # Each chunk commits on its own, so a lock error retries only the
+            # chunk that was rolled back, never the ones already applied
+            applied, errors, duplicates = self._call_with_lock_retries(
+                lambda: apply_chunk(events[offset:offset + chunk_size]))
+            report["applied"] += applied
+            report["errors"].extend(errors)
+            report["duplicates"] += duplicates
+
+        report["errors"].sort(key=lambda error: error["line"])
+        return report
+
+
+def _upsert(session, table, keys, values):
+    """
+    An INSERT that updates the row already holding the same ``keys`` instead.
+
+    ``values(new)`` returns the columns to update, given the proposed row
+    (``excluded`` for ON CONFLICT DO UPDATE on SQLite and PostgreSQL,
+    ``inserted`` for ON DUPLICATE KEY UPDATE on MySQL and MariaDB).
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        return statement.on_conflict_do_update(index_elements=keys, set_=values(statement.excluded))
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+        # MySQL matches any unique key; besides the id, each table has only the one in ``keys``
+        statement = dialect_insert(table)
+        return statement.on_duplicate_key_update(values(statement.inserted))
+    raise ValueError(f"Upserts need SQLite, PostgreSQL or MySQL/MariaDB, not {dialect}.")
+
+
+def _upsert_students(session):
+    """Upsert student rows on student_email."""
+    table = Student.__table__
+    return _upsert(session, table, [table.c.student_email], lambda new: {
+        "student_name": new.student_name,
+        # A row without an age keeps the age already stored
+        "age": func.coalesce(new.age, table.c.age),
+    })
+
+
+def _upsert_performance_records(session):
+    """Upsert performance record rows on (student_id, course_id)."""
+    table = PerformanceRecord.__table__
+    # Days present are left alone on existing records; ingest_attendance owns them
+    return _upsert(session, table, [table.c.student_id, table.c.course_id], lambda new: {
+        "grade": new.grade,
+        "grade_points": new.grade_points,
+    })
+
+
+def _as_id_list(student_ids):
+    """
+    Accept one ID, a sequence of IDs or a comma-separated string, and return a list of ints.
+
+    IDs that are not whole numbers cannot match a student, so they are left
+    out like any other unknown ID.
+    """
+    if isinstance(student_ids, str):
+        student_ids = [part for part in student_ids.split(',') if part.strip()]
+    elif not isinstance(student_ids, (list, tuple, set)):
+        student_ids = [student_ids]
+
+    ids = []
+    for student_id in student_ids:
+        try:
+            ids.append(int(student_id))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def _format_transcript(student_info):
+    """Format a student info dict the way get_student_info prints it."""
+    lines = [
+        "Student Information:",
+        f"Name: {student_info['name']}",
+        f"Student ID: {student_info['student_id']}",
+        f"Email: {student_info['email']}",
+        f"Age: {student_info['age']}",
+    ]
+
+    # Check if the student has enrolled in any courses
+    if student_info["courses"]:
+        lines.append("Courses Enrolled:")
+        for course in student_info["courses"]:
+            lines.append(f"- {course['course_name']} (Code: {course['course_code']}), Grade: {course['grade']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD string into a date, passing None through."""
+    if value is None:
+        return None
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
 if __name__ == "__main__":
+    import os
+    import fire
+    from .profiling import PROFILE_ENV, extract_profile_flag, profile_command, profiling_enabled
+
+    # --profile (or SMS_PROFILE=1) prints a JSON summary of the command's SQL to stderr
+    profile, argv = extract_profile_flag(sys.argv[1:])
+    if profile:
+        # Also profiles each command run by batch or shell
+        os.environ[PROFILE_ENV] = '1'
+
     sms = StudentManagementSystem()
-    fire.Fire(sms)
+    if profiling_enabled():
+        with profile_command(argv[0] if argv else None) as command_profile:
+            command_profile.result = fire.Fire(sms, command=argv)
+    else:
+        fire.Fire(sms, command=argv)
@@ -22,6 +22,12 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 from models import Base
 target_metadata = Base.metadata
+
+# Use the same database as the application (SMS_DATABASE_URL or sms.ini)
+from db import load_settings, DEFAULT_DATABASE_URL
+database_url = load_settings()['database_url']
+if database_url != DEFAULT_DATABASE_URL:
+    config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
 # target_metadata = None
 
 # other values from the config, defined by the needs of env.py,
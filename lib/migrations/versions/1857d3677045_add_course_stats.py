@@ -0,0 +1,115 @@
+"""add course stats
+
+Revision ID: 1857d3677045
+Revises: 8551334fde7d
+Create Date: 2026-10-18 11:26:52.913470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1857d3677045'
+down_revision: Union[str, None] = '8551334fde7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the course_stats triggers in models.py at the time of this migration
+ADD = """
+    INSERT INTO course_stats (course_id, grade, record_count, points_count, grade_points_sum, days_present_sum)
+    VALUES (NEW.course_id, COALESCE(NEW.grade, ''), 1,
+            CASE WHEN NEW.grade_points IS NULL THEN 0 ELSE 1 END,
+            COALESCE(NEW.grade_points, 0), COALESCE(NEW._num_days_present, 0))
+    ON CONFLICT (course_id, grade) DO UPDATE SET
+        record_count = course_stats.record_count + excluded.record_count,
+        points_count = course_stats.points_count + excluded.points_count,
+        grade_points_sum = course_stats.grade_points_sum + excluded.grade_points_sum,
+        days_present_sum = course_stats.days_present_sum + excluded.days_present_sum;
+"""
+
+REMOVE = """
+    UPDATE course_stats SET
+        record_count = record_count - 1,
+        points_count = points_count - CASE WHEN OLD.grade_points IS NULL THEN 0 ELSE 1 END,
+        grade_points_sum = grade_points_sum - COALESCE(OLD.grade_points, 0),
+        days_present_sum = days_present_sum - COALESCE(OLD._num_days_present, 0)
+    WHERE course_id = OLD.course_id AND grade = COALESCE(OLD.grade, '');
+    DELETE FROM course_stats
+    WHERE course_id = OLD.course_id AND grade = COALESCE(OLD.grade, '') AND record_count <= 0;
+"""
+
+COLUMNS = "course_id, grade, grade_points, _num_days_present"
+
+TRIGGERS = {
+    'sqlite': [
+        f"CREATE TRIGGER IF NOT EXISTS course_stats_insert AFTER INSERT ON performance_records "
+        f"BEGIN {ADD} END",
+        f"CREATE TRIGGER IF NOT EXISTS course_stats_update AFTER UPDATE OF {COLUMNS} "
+        f"ON performance_records BEGIN {REMOVE} {ADD} END",
+        f"CREATE TRIGGER IF NOT EXISTS course_stats_delete AFTER DELETE ON performance_records "
+        f"BEGIN {REMOVE} END",
+    ],
+    'postgresql': [
+        f"""CREATE OR REPLACE FUNCTION course_stats_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN {REMOVE} END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN {ADD} END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS course_stats_maintain ON performance_records",
+        f"CREATE TRIGGER course_stats_maintain "
+        f"AFTER INSERT OR DELETE OR UPDATE OF {COLUMNS} ON performance_records "
+        f"FOR EACH ROW EXECUTE PROCEDURE course_stats_apply()",
+    ],
+}
+
+DROP_TRIGGERS = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS course_stats_insert",
+        "DROP TRIGGER IF EXISTS course_stats_update",
+        "DROP TRIGGER IF EXISTS course_stats_delete",
+    ],
+    'postgresql': [
+        "DROP TRIGGER IF EXISTS course_stats_maintain ON performance_records",
+        "DROP FUNCTION IF EXISTS course_stats_apply()",
+    ],
+}
+
+
+def upgrade() -> None:
+    # The initial migration created performance_records without the days present column
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('performance_records')}
+    if '_num_days_present' not in columns:
+        op.add_column('performance_records', sa.Column('_num_days_present', sa.Integer(), nullable=True))
+
+    op.create_table('course_stats',
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('grade', sa.String(length=2), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.Column('points_count', sa.Integer(), nullable=False),
+    sa.Column('grade_points_sum', sa.Float(), nullable=False),
+    sa.Column('days_present_sum', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.PrimaryKeyConstraint('course_id', 'grade')
+    )
+
+    # Summarize the existing records before the triggers take over
+    op.execute(
+        "INSERT INTO course_stats (course_id, grade, record_count, points_count, grade_points_sum, days_present_sum) "
+        "SELECT course_id, COALESCE(grade, ''), COUNT(*), COUNT(grade_points), "
+        "COALESCE(SUM(grade_points), 0), COALESCE(SUM(_num_days_present), 0) "
+        "FROM performance_records GROUP BY course_id, COALESCE(grade, '')"
+    )
+
+    for statement in TRIGGERS.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DROP_TRIGGERS.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+    op.drop_table('course_stats')
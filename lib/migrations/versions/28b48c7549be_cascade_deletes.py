@@ -0,0 +1,70 @@
+"""cascade deletes
+
+Revision ID: 28b48c7549be
+Revises: fc55e2f3128a
+Create Date: 2026-10-18 16:55:08.702144
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '28b48c7549be'
+down_revision: Union[str, None] = 'fc55e2f3128a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Foreign keys that now cascade: table -> [(column, referred table)]
+FOREIGN_KEYS = {
+    'performance_records': [('student_id', 'students'), ('course_id', 'courses')],
+    'enrollments': [('student_id', 'students'), ('course_id', 'courses')],
+    'attendance_log': [('student_id', 'students'), ('course_id', 'courses')],
+    'course_stats': [('course_id', 'courses')],
+}
+
+# SQLite foreign keys created so far have no names; batch mode names them
+# with this convention so they can be dropped
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def constraint_name(table, column, referred):
+    if op.get_bind().dialect.name == 'sqlite':
+        return f"fk_{table}_{column}_{referred}"
+    # PostgreSQL's default name for an unnamed foreign key
+    return f"{table}_{column}_fkey"
+
+
+def replace_foreign_keys(ondelete):
+    bind = op.get_bind()
+
+    # SQLite rebuilds each table, which drops the triggers on it and fails on
+    # triggers that refer to a table while it is being swapped, so all
+    # triggers are taken out first and put back at the end
+    triggers = []
+    if bind.dialect.name == 'sqlite':
+        triggers = bind.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").all()
+        for name, _ in triggers:
+            op.execute(f"DROP TRIGGER {name}")
+
+    for table, foreign_keys in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in foreign_keys:
+                name = constraint_name(table, column, referred)
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+    for _, sql in triggers:
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    replace_foreign_keys('CASCADE')
+    # Cascading a course delete looks its attendance up by course
+    op.create_index('ix_attendance_log_course', 'attendance_log', ['course_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_log_course', table_name='attendance_log')
+    replace_foreign_keys(None)
@@ -0,0 +1,55 @@
+"""add grade points
+
+Revision ID: 300f46218c32
+Revises: 399ff81943b4
+Create Date: 2026-10-18 09:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '300f46218c32'
+down_revision: Union[str, None] = '399ff81943b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of models.GRADE_POINTS at the time of this migration
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 4.0, 'A-': 3.7,
+    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
+    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
+    'D+': 1.3, 'D': 1.0, 'D-': 0.7,
+    'E': 0.0, 'F': 0.0,
+}
+
+
+def upgrade() -> None:
+    op.add_column('performance_records', sa.Column('grade_points', sa.Float(), nullable=True))
+
+    # Backfill grade points for the existing letter grades
+    performance_records = sa.table(
+        'performance_records',
+        sa.column('grade', sa.String(2)),
+        sa.column('grade_points', sa.Float()),
+    )
+    op.execute(
+        performance_records.update().values(
+            grade_points=sa.case(
+                GRADE_POINTS,
+                value=sa.func.upper(sa.func.trim(performance_records.c.grade)),
+                else_=None,
+            )
+        )
+    )
+
+    op.create_index('ix_performance_records_course_grade_points', 'performance_records', ['course_id', 'grade_points'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_performance_records_course_grade_points', table_name='performance_records')
+    with op.batch_alter_table('performance_records') as batch_op:
+        batch_op.drop_column('grade_points')
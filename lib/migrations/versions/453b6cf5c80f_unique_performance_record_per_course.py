@@ -0,0 +1,41 @@
+"""unique performance record per course
+
+Revision ID: 453b6cf5c80f
+Revises: 4aa01c212305
+Create Date: 2026-10-18 14:02:39.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '453b6cf5c80f'
+down_revision: Union[str, None] = '4aa01c212305'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the newest record of each student and course, carrying over the
+    # most days present any of the duplicates had
+    op.execute(
+        "UPDATE performance_records SET _num_days_present = ("
+        "SELECT MAX(duplicate._num_days_present) FROM performance_records duplicate "
+        "WHERE duplicate.student_id = performance_records.student_id "
+        "AND duplicate.course_id = performance_records.course_id) "
+        "WHERE id IN (SELECT MAX(id) FROM performance_records GROUP BY student_id, course_id HAVING COUNT(*) > 1)"
+    )
+    op.execute(
+        "DELETE FROM performance_records "
+        "WHERE id NOT IN (SELECT MAX(id) FROM performance_records GROUP BY student_id, course_id)"
+    )
+
+    op.drop_index('ix_performance_records_student_course', table_name='performance_records')
+    op.create_index('ix_performance_records_student_course', 'performance_records', ['student_id', 'course_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_performance_records_student_course', table_name='performance_records')
+    op.create_index('ix_performance_records_student_course', 'performance_records', ['student_id', 'course_id'])
@@ -0,0 +1,33 @@
+"""add attendance log
+
+Revision ID: 4aa01c212305
+Revises: 1857d3677045
+Create Date: 2026-10-18 12:48:05.661372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4aa01c212305'
+down_revision: Union[str, None] = '1857d3677045'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('attendance_log',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'course_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('attendance_log')
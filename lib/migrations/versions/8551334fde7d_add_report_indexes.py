@@ -0,0 +1,41 @@
+"""add report indexes
+
+Revision ID: 8551334fde7d
+Revises: 300f46218c32
+Create Date: 2026-10-18 10:03:17.274519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8551334fde7d'
+down_revision: Union[str, None] = '300f46218c32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_performance_records_student_course', 'performance_records', ['student_id', 'course_id'])
+    op.create_index('ix_performance_records_course_student', 'performance_records', ['course_id', 'student_id'])
+
+    # The initial migration did not create the enrollments table
+    if not sa.inspect(op.get_bind()).has_table('enrollments'):
+        op.create_table('enrollments',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('_num_days_present', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+        sa.PrimaryKeyConstraint('student_id', 'course_id')
+        )
+    op.create_index('ix_enrollments_course_student', 'enrollments', ['course_id', 'student_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_enrollments_course_student', table_name='enrollments')
+    op.drop_index('ix_performance_records_course_student', table_name='performance_records')
+    op.drop_index('ix_performance_records_student_course', table_name='performance_records')
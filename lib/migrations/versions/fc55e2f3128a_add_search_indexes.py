@@ -0,0 +1,83 @@
+"""add search indexes
+
+Revision ID: fc55e2f3128a
+Revises: 453b6cf5c80f
+Create Date: 2026-10-18 15:37:20.486913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fc55e2f3128a'
+down_revision: Union[str, None] = '453b6cf5c80f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of models.SEARCH_COLUMNS at the time of this migration
+SEARCH_COLUMNS = {
+    'students': ('student_name', 'student_email'),
+    'courses': ('course_code', 'course_name', 'instructor'),
+}
+
+
+def sqlite_ddl(table_name, columns):
+    fts = f"{table_name}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    insert_new = f"INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values});"
+    delete_old = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table_name}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table_name} "
+        f"BEGIN {delete_old} {insert_new} END",
+        # Index the rows that are already there
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+def sqlite_trigram_available(bind):
+    # The trigram tokenizer needs SQLite 3.34 or newer built with FTS5; without
+    # it the search command uses LIKE, so there is nothing to create
+    options = {row[0] for row in bind.exec_driver_sql("PRAGMA compile_options")}
+    return bind.dialect.server_version_info >= (3, 34) and 'ENABLE_FTS5' in options
+
+
+def postgresql_ddl(table_name, columns):
+    return ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{name}_trgm ON {table_name} USING gin ({name} gin_trgm_ops)"
+        for name in columns
+    ]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    trigram = dialect == 'sqlite' and sqlite_trigram_available(bind)
+    for table_name, columns in SEARCH_COLUMNS.items():
+        if trigram:
+            statements = sqlite_ddl(table_name, columns)
+        elif dialect == 'postgresql':
+            statements = postgresql_ddl(table_name, columns)
+        else:
+            statements = []
+        for statement in statements:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table_name, columns in SEARCH_COLUMNS.items():
+        if dialect == 'sqlite':
+            for event_name in ('insert', 'delete', 'update'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table_name}_fts_{event_name}")
+            op.execute(f"DROP TABLE IF EXISTS {table_name}_fts")
+        elif dialect == 'postgresql':
+            for name in columns:
+                op.execute(f"DROP INDEX IF EXISTS ix_{table_name}_{name}_trgm")
@@ -1,11 +1,62 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Date, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Date, Float, Index
+from sqlalchemy import DDL, case, cast, column, event, select, table
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.expression import FunctionElement
 
 Base = declarative_base()
 
+# Grade points on a 4.0 scale, used to rank students numerically
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 4.0, 'A-': 3.7,
+    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
+    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
+    'D+': 1.3, 'D': 1.0, 'D-': 0.7,
+    'E': 0.0, 'F': 0.0,
+}
+
+
+def grade_to_points(grade):
+    """Map a letter grade to grade points, or None if it is not a known grade."""
+    if grade is None:
+        return None
+    return GRADE_POINTS.get(str(grade).strip().upper())
+
+
+def _default_grade_points(context):
+    # Fill in grade points for Core inserts that only provide the letter grade
+    return grade_to_points(context.get_current_parameters().get('grade'))
+
+
+class days_between(FunctionElement):
+    """SQL expression for the number of days from one date to another."""
+    type = Integer()
+    name = 'days_between'
+    inherit_cache = True
+
+
+@compiles(days_between)
+def _days_between(element, compiler, **kw):
+    # Subtracting two dates gives a whole number of days on PostgreSQL
+    start, end = list(element.clauses)
+    return f"({compiler.process(end, **kw)} - {compiler.process(start, **kw)})"
+
+
+@compiles(days_between, 'sqlite')
+def _days_between_sqlite(element, compiler, **kw):
+    # SQLite stores dates as text, so go through julian day numbers
+    start, end = list(element.clauses)
+    return f"CAST(julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}) AS INTEGER)"
+
+
+@compiles(days_between, 'mysql')
+def _days_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"DATEDIFF({compiler.process(end, **kw)}, {compiler.process(start, **kw)})"
+
 class Student(Base):
     __tablename__ = 'students'
 
@@ -15,8 +66,10 @@ class Student(Base):
     age = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    performance_records = relationship('PerformanceRecord', back_populates='student')
-    courses = relationship('Course', secondary='enrollments', back_populates='students')
+    # Dependent rows are removed by ON DELETE CASCADE, so deleting a student
+    # does not need to load them first
+    performance_records = relationship('PerformanceRecord', back_populates='student', passive_deletes=True)
+    courses = relationship('Course', secondary='enrollments', back_populates='students', passive_deletes=True)
 
 
 class Course(Base):
@@ -29,28 +82,47 @@ class Course(Base):
     start_date = Column(Date)
     end_date = Column(Date)
 
-    performance_records = relationship('PerformanceRecord', back_populates='course')
-    students = relationship('Student', secondary='enrollments', back_populates='courses')
+    performance_records = relationship('PerformanceRecord', back_populates='course', passive_deletes=True)
+    students = relationship('Student', secondary='enrollments', back_populates='courses', passive_deletes=True)
 
 class Enrollment(Base):
     __tablename__ = 'enrollments'
 
-    student_id = Column(Integer, ForeignKey('students.id'), primary_key=True)
-    course_id = Column(Integer, ForeignKey('courses.id'), primary_key=True)
+    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    course_id = Column(Integer, ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True)
     _num_days_present = Column(Integer)
 
+    __table_args__ = (
+        # The primary key covers lookups by student; this one covers lookups by course
+        Index('ix_enrollments_course_student', 'course_id', 'student_id'),
+    )
+
 class PerformanceRecord(Base):
     __tablename__ = 'performance_records'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    student_id = Column(Integer, ForeignKey('students.id'), nullable=False)
-    course_id = Column(Integer, ForeignKey('courses.id'), nullable=False)
+    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
+    course_id = Column(Integer, ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
     grade = Column(String(2))
+    grade_points = Column(Float, default=_default_grade_points)
     _num_days_present = Column(Integer, default=0)
-    
+
+    __table_args__ = (
+        # One record per student and course; also the conflict target for upserts
+        Index('ix_performance_records_student_course', 'student_id', 'course_id', unique=True),
+        Index('ix_performance_records_course_student', 'course_id', 'student_id'),
+        Index('ix_performance_records_course_grade_points', 'course_id', 'grade_points'),
+    )
+
     student = relationship('Student', back_populates='performance_records')
     course = relationship('Course', back_populates='performance_records')
 
+    @validates('grade')
+    def validate_grade(self, key, grade):
+        # Keep the numeric grade points in step with the letter grade
+        self.grade_points = grade_to_points(grade)
+        return grade
+
     @hybrid_property
     def num_days_present(self):
         return self._num_days_present
@@ -74,4 +146,222 @@ class PerformanceRecord(Base):
                 return 0
         else:
             # If 'course' is not set, attendance cannot be calculated, so return None
-            return None
\ No newline at end of file
+            return None
+
+    @attendance.expression
+    def attendance(cls):
+        # Same calculation in SQL, reading the course dates through a correlated
+        # subquery so attendance can be selected, filtered and ordered on
+        total_days = days_between(Course.start_date, Course.end_date) + 1
+        return (
+            select(case((total_days > 0, cast(cls._num_days_present, Float) / total_days * 100), else_=0))
+            .where(Course.id == cls.course_id)
+            .correlate_except(Course)
+            .scalar_subquery()
+        )
+
+
+class AttendanceLog(Base):
+    """
+    One row per day a student was present in a course.
+
+    Written by ingest_attendance alongside the day counters on
+    performance_records and enrollments, so a day that was already counted
+    is recognized and not counted again.
+    """
+    __tablename__ = 'attendance_log'
+
+    student_id = Column(Integer, ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    course_id = Column(Integer, ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    __table_args__ = (
+        # Finds the rows of a course, e.g. when a course is deleted
+        Index('ix_attendance_log_course', 'course_id'),
+    )
+
+class CourseStats(Base):
+    """
+    Running totals of the performance records of each course, per grade.
+
+    Database triggers keep the rows in step with every insert, update and
+    delete on performance_records, so course statistics are read from a few
+    rows instead of aggregating the whole course. Records without a grade are
+    counted under the empty grade ''.
+    """
+    __tablename__ = 'course_stats'
+
+    course_id = Column(Integer, ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True)
+    grade = Column(String(2), primary_key=True)
+    record_count = Column(Integer, nullable=False, default=0)
+    # Records whose grade maps to grade points, i.e. the ones grade_points_sum covers
+    points_count = Column(Integer, nullable=False, default=0)
+    grade_points_sum = Column(Float, nullable=False, default=0)
+    days_present_sum = Column(Integer, nullable=False, default=0)
+
+
+# Statements shared by the SQLite triggers and the PostgreSQL trigger function.
+# Both databases support INSERT ... ON CONFLICT, so one record is added to its
+# (course, grade) row with an upsert, and removed by decrementing the row and
+# dropping it once it is empty.
+_COURSE_STATS_ADD = """
+    INSERT INTO course_stats (course_id, grade, record_count, points_count, grade_points_sum, days_present_sum)
+    VALUES (NEW.course_id, COALESCE(NEW.grade, ''), 1,
+            CASE WHEN NEW.grade_points IS NULL THEN 0 ELSE 1 END,
+            COALESCE(NEW.grade_points, 0), COALESCE(NEW._num_days_present, 0))
+    ON CONFLICT (course_id, grade) DO UPDATE SET
+        record_count = course_stats.record_count + excluded.record_count,
+        points_count = course_stats.points_count + excluded.points_count,
+        grade_points_sum = course_stats.grade_points_sum + excluded.grade_points_sum,
+        days_present_sum = course_stats.days_present_sum + excluded.days_present_sum;
+"""
+
+_COURSE_STATS_REMOVE = """
+    UPDATE course_stats SET
+        record_count = record_count - 1,
+        points_count = points_count - CASE WHEN OLD.grade_points IS NULL THEN 0 ELSE 1 END,
+        grade_points_sum = grade_points_sum - COALESCE(OLD.grade_points, 0),
+        days_present_sum = days_present_sum - COALESCE(OLD._num_days_present, 0)
+    WHERE course_id = OLD.course_id AND grade = COALESCE(OLD.grade, '');
+    DELETE FROM course_stats
+    WHERE course_id = OLD.course_id AND grade = COALESCE(OLD.grade, '') AND record_count <= 0;
+"""
+
+# Only changes to these columns move a record between or within stats rows
+_COURSE_STATS_COLUMNS = "course_id, grade, grade_points, _num_days_present"
+
+COURSE_STATS_TRIGGERS = {
+    'sqlite': [
+        f"CREATE TRIGGER IF NOT EXISTS course_stats_insert AFTER INSERT ON performance_records "
+        f"BEGIN {_COURSE_STATS_ADD} END",
+        f"CREATE TRIGGER IF NOT EXISTS course_stats_update AFTER UPDATE OF {_COURSE_STATS_COLUMNS} "
+        f"ON performance_records BEGIN {_COURSE_STATS_REMOVE} {_COURSE_STATS_ADD} END",
+        f"CREATE TRIGGER IF NOT EXISTS course_stats_delete AFTER DELETE ON performance_records "
+        f"BEGIN {_COURSE_STATS_REMOVE} END",
+    ],
+    'postgresql': [
+        f"""CREATE OR REPLACE FUNCTION course_stats_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN {_COURSE_STATS_REMOVE} END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN {_COURSE_STATS_ADD} END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS course_stats_maintain ON performance_records",
+        f"CREATE TRIGGER course_stats_maintain "
+        f"AFTER INSERT OR DELETE OR UPDATE OF {_COURSE_STATS_COLUMNS} ON performance_records "
+        f"FOR EACH ROW EXECUTE PROCEDURE course_stats_apply()",
+    ],
+}
+
+COURSE_STATS_DROP = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS course_stats_insert",
+        "DROP TRIGGER IF EXISTS course_stats_update",
+        "DROP TRIGGER IF EXISTS course_stats_delete",
+    ],
+    'postgresql': [
+        "DROP TRIGGER IF EXISTS course_stats_maintain ON performance_records",
+        "DROP FUNCTION IF EXISTS course_stats_apply()",
+    ],
+}
+
+# Install the triggers whenever create_all() creates the tables. Other
+# databases get the table but no triggers; rebuild_course_stats fills it.
+for _dialect, _statements in COURSE_STATS_TRIGGERS.items():
+    for _statement in _statements:
+        event.listen(PerformanceRecord.__table__, 'after_create', DDL(_statement).execute_if(dialect=_dialect))
+for _dialect, _statements in COURSE_STATS_DROP.items():
+    for _statement in _statements:
+        event.listen(PerformanceRecord.__table__, 'before_drop', DDL(_statement).execute_if(dialect=_dialect))
+
+
+# Columns searched by the search command, per table
+SEARCH_COLUMNS = {
+    'students': ('student_name', 'student_email'),
+    'courses': ('course_code', 'course_name', 'instructor'),
+}
+
+
+def sqlite_trigram_available(connection):
+    """
+    Whether a SQLite connection can use FTS5 trigram indexes.
+
+    The trigram tokenizer needs SQLite 3.34 or newer built with FTS5. The
+    answer is kept in the connection's info, so the compile options are read
+    once per pooled connection.
+    """
+    if 'sqlite_trigram' not in connection.info:
+        options = {row[0] for row in connection.exec_driver_sql("PRAGMA compile_options")}
+        connection.info['sqlite_trigram'] = (
+            connection.dialect.server_version_info >= (3, 34) and 'ENABLE_FTS5' in options
+        )
+    return connection.info['sqlite_trigram']
+
+
+def _sqlite_search_ddl(table_name, columns):
+    """
+    An FTS5 index over some columns of a table, and the triggers keeping it in sync.
+
+    The index is an external content table: it stores only the trigram
+    index and reads the text back from the table itself. Trigrams match any
+    substring of three or more characters, so partial names and emails are
+    found without a LIKE scan.
+    """
+    fts = f"{table_name}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    insert_new = f"INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values});"
+    delete_old = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table_name}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table_name} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _postgresql_search_ddl(table_name, columns):
+    # Trigram GIN indexes serve ILIKE '%...%' and are kept current by PostgreSQL itself
+    return ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{name}_trgm ON {table_name} USING gin ({name} gin_trgm_ops)"
+        for name in columns
+    ]
+
+
+SEARCH_DDL = {
+    table_name: {'sqlite': _sqlite_search_ddl(table_name, columns),
+                 'postgresql': _postgresql_search_ddl(table_name, columns)}
+    for table_name, columns in SEARCH_COLUMNS.items()
+}
+
+# Dropping a table would leave its FTS5 table behind, so both it and the
+# triggers are dropped first; PostgreSQL drops the indexes with the table
+SEARCH_DROP = {
+    table_name: {'sqlite': [f"DROP TRIGGER IF EXISTS {table_name}_fts_{event_name}"
+                            for event_name in ('insert', 'delete', 'update')]
+                 + [f"DROP TABLE IF EXISTS {table_name}_fts"]}
+    for table_name in SEARCH_COLUMNS
+}
+
+# The FTS5 tables, for use in queries; they are not part of the metadata,
+# since create_all() cannot create virtual tables
+students_fts = table('students_fts', column('rowid'), *(column(name) for name in SEARCH_COLUMNS['students']))
+courses_fts = table('courses_fts', column('rowid'), *(column(name) for name in SEARCH_COLUMNS['courses']))
+
+def _search_ddl_supported(ddl, target, bind, **kw):
+    # Without trigram support the search command falls back to LIKE
+    return bind.dialect.name != 'sqlite' or sqlite_trigram_available(bind)
+
+
+for _table in (Student.__table__, Course.__table__):
+    for _dialect, _statements in SEARCH_DDL[_table.name].items():
+        for _statement in _statements:
+            event.listen(_table, 'after_create',
+                         DDL(_statement).execute_if(dialect=_dialect, callable_=_search_ddl_supported))
+    for _dialect, _statements in SEARCH_DROP[_table.name].items():
+        for _statement in _statements:
+            event.listen(_table, 'before_drop', DDL(_statement).execute_if(dialect=_dialect))
@@ -0,0 +1,221 @@
+import collections.abc
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('sms.slow_queries')
+
+# Environment variables that switch profiling on and tune it
+PROFILE_ENV = 'SMS_PROFILE'
+SLOW_QUERY_ENV = 'SMS_PROFILE_SLOW_MS'
+CPROFILE_ENV = 'SMS_PROFILE_CPROFILE'
+OUTPUT_ENV = 'SMS_PROFILE_OUTPUT'
+
+
+def profiling_enabled():
+    """True when SMS_PROFILE asks for profiling."""
+    return os.environ.get(PROFILE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def extract_profile_flag(argv):
+    """Remove a --profile flag from CLI arguments, returning (found, remaining arguments)."""
+    remaining = [arg for arg in argv if arg != '--profile']
+    return len(remaining) != len(argv), remaining
+
+
+class _CountingCursor:
+    """A DBAPI cursor wrapper that counts the rows fetched through it into a statement record."""
+
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._record["rows_fetched"] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._record["rows_fetched"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._record["rows_fetched"] += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class QueryProfiler:
+    """
+    Record every SQL statement run through SQLAlchemy while attached.
+
+    Listens to the engine cursor events of one engine, or of every engine
+    when none is given, and keeps the duration of each statement with the
+    rows it fetched or, for writes, the rows it affected. Statements slower
+    than ``slow_query_ms`` are also logged to the ``sms.slow_queries`` logger.
+    """
+
+    def __init__(self, engine=None, slow_query_ms: float = 100.0):
+        self.target = engine if engine is not None else Engine
+        self.slow_query_ms = slow_query_ms
+        self.statements = []
+        self._starts = threading.local()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not hasattr(self._starts, 'stack'):
+            self._starts.stack = []
+        self._starts.stack.append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - self._starts.stack.pop()) * 1000
+        record = {"ms": duration_ms, "rows_fetched": 0, "rows_affected": None, "statement": statement}
+        if cursor.description is not None:
+            # rowcount is -1 for SELECT, so count the rows as the result reads them
+            if context is not None:
+                context.cursor = _CountingCursor(cursor, record)
+        elif cursor.rowcount is not None and cursor.rowcount >= 0:
+            record["rows_affected"] = cursor.rowcount
+        self.statements.append(record)
+
+        if duration_ms >= self.slow_query_ms:
+            logger.warning("Slow query (%.1f ms): %s", duration_ms, statement)
+
+    def attach(self):
+        event.listen(self.target, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self.target, "after_cursor_execute", self._after_cursor_execute)
+        return self
+
+    def detach(self):
+        event.remove(self.target, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(self.target, "after_cursor_execute", self._after_cursor_execute)
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.detach()
+
+    def summary(self):
+        """Totals over the recorded statements, plus the slow ones."""
+        return {
+            "statements": len(self.statements),
+            "sql_ms": round(sum(s["ms"] for s in self.statements), 3),
+            "rows_fetched": sum(s["rows_fetched"] for s in self.statements),
+            "rows_affected": sum(s["rows_affected"] for s in self.statements if s["rows_affected"] is not None),
+            "slow_queries": [
+                {"ms": round(s["ms"], 3), "statement": s["statement"]}
+                for s in self.statements if s["ms"] >= self.slow_query_ms
+            ],
+        }
+
+
+# Keys of the summaries that say how many rows a command loaded or wrote:
+# imports, attendance ingest, rebuild_course_stats and generate_reports
+ROW_COUNT_KEYS = ('inserted', 'applied', 'rows', 'courses')
+
+
+def count_result_rows(result):
+    """
+    How many rows a command returned.
+
+    Collections count their items. Dicts give the row count of an import or
+    report summary, otherwise the items of the lists they hold (a list_*
+    page, search matches). Any other result, such as a transcript, message or stats dict,
+    is one row; commands that return nothing give None.
+    """
+    if result is None:
+        return None
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ROW_COUNT_KEYS:
+            if isinstance(result.get(key), int):
+                return result[key]
+        lists = [value for value in result.values() if isinstance(value, list)]
+        if lists:
+            return sum(len(value) for value in lists)
+        return 1
+    if isinstance(result, collections.abc.Sized) and not isinstance(result, str):
+        return len(result)
+    return 1
+
+
+class CommandProfile:
+    """Profiling results for one command, filled in by profile_command()."""
+
+    def __init__(self, command, profiler):
+        self.command = command
+        self.profiler = profiler
+        self.wall_ms = None
+        self.result = None
+        self.cprofile_path = None
+
+    def summary(self):
+        return {
+            "command": self.command,
+            "wall_ms": round(self.wall_ms, 3) if self.wall_ms is not None else None,
+            "rows_returned": count_result_rows(self.result),
+            **self.profiler.summary(),
+            "cprofile": self.cprofile_path,
+        }
+
+
+@contextmanager
+def profile_command(command, engine=None, slow_query_ms=None, cprofile_path=None, output=None):
+    """
+    Profile one command and emit a JSON summary when it finishes.
+
+    Records wall time, the SQL statements issued and their timings, and
+    optionally a cProfile dump. Set ``profile.result`` to the command's return
+    value to include the number of rows it returned. The summary is written as
+    one JSON line to ``output`` (a path to append to, or stderr by default).
+
+    Settings not passed in are read from SMS_PROFILE_SLOW_MS (default 100),
+    SMS_PROFILE_CPROFILE and SMS_PROFILE_OUTPUT.
+    """
+    if slow_query_ms is None:
+        slow_query_ms = float(os.environ.get(SLOW_QUERY_ENV, 100))
+    cprofile_path = cprofile_path or os.environ.get(CPROFILE_ENV)
+    output = output or os.environ.get(OUTPUT_ENV)
+
+    profiler = QueryProfiler(engine, slow_query_ms)
+    profile = CommandProfile(command, profiler)
+
+    cprofiler = None
+    if cprofile_path:
+        import cProfile
+
+        cprofiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    profiler.attach()
+    if cprofiler:
+        cprofiler.enable()
+    try:
+        yield profile
+    finally:
+        if cprofiler:
+            cprofiler.disable()
+            cprofiler.dump_stats(cprofile_path)
+            profile.cprofile_path = cprofile_path
+        profiler.detach()
+        profile.wall_ms = (time.perf_counter() - start) * 1000
+
+        line = json.dumps(profile.summary(), default=str)
+        if output:
+            with open(output, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        else:
+            print(line, file=sys.stderr)
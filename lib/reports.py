@@ -0,0 +1,101 @@
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Set up once in each worker process by _init_worker
+_worker_sms = None
+
+
+def report_path(output_dir, course_code):
+    """The report file for a course, with characters unsafe in file names replaced."""
+    return os.path.join(output_dir, re.sub(r'[^\w.-]', '_', course_code) + '.json')
+
+
+def write_course_report(sms, course_code, output_dir):
+    """
+    Write one course's performance records and ranking to a JSON file.
+
+    Returns:
+        int: The number of performance records in the report, or None if the
+             course does not exist (no file is written).
+    """
+    if sms._find_course(course_code) is None:
+        return None
+
+    records = sms.get_performance_records(course_code)
+    ranking = [row._asdict() for row in sms.rank_students(course_code)]
+
+    with open(report_path(output_dir, course_code), 'w', encoding='utf-8') as f:
+        json.dump({"course_code": course_code, "performance_records": records, "ranking": ranking},
+                  f, default=str, indent=2)
+    return len(records)
+
+
+def _init_worker(url):
+    # Each worker opens its own read-only engine; connections cannot be
+    # shared with the parent process
+    global _worker_sms
+    from sqlalchemy.orm import sessionmaker
+
+    from .db import create_read_only_engine
+    from .main import StudentManagementSystem
+
+    _worker_sms = StudentManagementSystem(session=sessionmaker(bind=create_read_only_engine(url))())
+
+
+def _write_reports(course_codes, output_dir):
+    start = time.perf_counter()
+    records, unknown = 0, []
+    for course_code in course_codes:
+        count = write_course_report(_worker_sms, course_code, output_dir)
+        if count is None:
+            unknown.append(course_code)
+        else:
+            records += count
+    # End the read transaction so the worker does not pin an old snapshot
+    _worker_sms.session.rollback()
+    return len(course_codes) - len(unknown), records, unknown, time.perf_counter() - start
+
+
+def generate_reports(url, course_codes, output_dir, workers, chunk_size=None, progress=sys.stderr):
+    """
+    Write a report file per course using a pool of worker processes.
+
+    Courses are split into chunks that the workers pick up as they finish
+    earlier ones. Progress is printed to ``progress`` after every chunk.
+    Codes of courses that do not exist are skipped and listed.
+
+    Returns:
+        dict: ``courses`` (reports written), ``records``, ``unknown_courses``,
+              ``workers``, ``seconds`` (wall time) and ``worker_seconds``
+              (time summed over all workers).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # A few chunks per worker keeps them busy when some courses are larger
+    chunk_size = chunk_size or max(1, math.ceil(len(course_codes) / (workers * 4)))
+    chunks = [course_codes[i:i + chunk_size] for i in range(0, len(course_codes), chunk_size)]
+
+    summary = {"courses": 0, "records": 0, "unknown_courses": [], "workers": workers,
+               "seconds": 0.0, "worker_seconds": 0.0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(url,)) as executor:
+        futures = [executor.submit(_write_reports, chunk, output_dir) for chunk in chunks]
+        for future in as_completed(futures):
+            courses, records, unknown, seconds = future.result()
+            summary["courses"] += courses
+            summary["records"] += records
+            summary["unknown_courses"].extend(unknown)
+            summary["worker_seconds"] += seconds
+            if progress is not None:
+                print(f"{summary['courses'] + len(summary['unknown_courses'])}/{len(course_codes)} courses, "
+                      f"{time.perf_counter() - start:.1f}s", file=progress)
+
+    summary["unknown_courses"].sort()
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    summary["worker_seconds"] = round(summary["worker_seconds"], 3)
+    return summary
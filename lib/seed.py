@@ -1,18 +1,28 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from .models import Student, Course, PerformanceRecord  # Adjust the import path as needed
-from datetime import datetime
+import random
+import sys
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert, select
+from .db import get_engine, get_session_factory
+from .models import Base, Student, Course, PerformanceRecord, Enrollment, grade_to_points  # Adjust the import path as needed
 
+# Default share of each letter grade in generated data
+DEFAULT_GRADE_WEIGHTS = {
+    'A': 15, 'A-': 10, 'B+': 12, 'B': 15, 'B-': 10,
+    'C+': 10, 'C': 10, 'C-': 6, 'D': 7, 'F': 5,
+}
 
-def populate_mock_data():
-    # Define the database URL (same as in main.py)
-    database_url = 'sqlite:///student_management.db'
+FIRST_NAMES = ['John', 'Jane', 'Jojo', 'Abdul', 'Wendy', 'Amina', 'Brian', 'Chloe', 'David', 'Esther',
+               'Faith', 'George', 'Hassan', 'Irene', 'James', 'Kevin', 'Lucy', 'Mary', 'Njeri', 'Otieno']
+LAST_NAMES = ['Doe', 'Smith', 'Kantai', 'Abdala', 'Wafula', 'Kamau', 'Odhiambo', 'Wanjiku', 'Mutua', 'Achieng',
+              'Johnson', 'Rose', 'Kiptoo', 'Chebet', 'Mwangi', 'Njoroge', 'Ouma', 'Kariuki', 'Barasa', 'Atieno']
+SUBJECTS = ['Math', 'Physics', 'Chemistry', 'Biology', 'English', 'History', 'Geography', 'Economics',
+            'Computer Science', 'Art', 'Music', 'Kiswahili', 'French', 'Statistics', 'Philosophy']
+INSTRUCTORS = ['Dr. Smith', 'Prof. Johnson', 'Dr. Kamande', 'Prof. Rose', 'Dr. Achieng', 'Prof. Mwangi']
 
-    # Create the database engine
-    engine = create_engine(database_url)
 
-    # Create a session to interact with the database
-    Session = sessionmaker(bind=engine)
+def populate_mock_data():
+    # Create a session to interact with the database (same configuration as main.py)
+    Session = get_session_factory()
     session = Session()
 
     # Populate the 'students' table with mock data
@@ -63,5 +73,118 @@ def populate_mock_data():
     # Commit the changes to the database
     session.commit()
 
+def generate_synthetic_data(students: int = 1000, courses: int = 50, enrollments_per_student: int = 5,
+                            seed: int = 42, grade_weights=None, attendance_mean: float = 0.85,
+                            attendance_stddev: float = 0.1, batch_size: int = 10000, engine=None):
+    """
+    Fill the database with a reproducible synthetic dataset.
+
+    The same arguments always produce the same rows. Each student is enrolled
+    in ``enrollments_per_student`` distinct courses, with a performance record
+    and an enrollment row per course. Grades follow ``grade_weights`` (letter
+    grade -> relative weight) and the share of days present is drawn from a
+    normal distribution around ``attendance_mean``. Rows are written with Core
+    multi-row inserts, ``batch_size`` rows per transaction.
+
+    New rows get IDs after the highest existing ones, so the generator can
+    add to a database that already has data. On PostgreSQL the ID sequences
+    are then advanced past them.
+
+    Returns:
+        dict: The number of rows written to each table.
+    """
+    engine = engine or get_engine()
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(seed)
+    grade_weights = grade_weights or DEFAULT_GRADE_WEIGHTS
+    grades = list(grade_weights)
+    weights = [grade_weights[grade] for grade in grades]
+    enrollments_per_student = min(enrollments_per_student, courses)
+    counts = {"students": 0, "courses": 0, "performance_records": 0, "enrollments": 0}
+
+    with engine.connect() as conn:
+        first_student_id = (conn.scalar(select(func.max(Student.id))) or 0) + 1
+        first_course_id = (conn.scalar(select(func.max(Course.id))) or 0) + 1
+
+    def write(table, rows):
+        if not rows:
+            return
+        with engine.begin() as conn:
+            conn.execute(insert(table), rows)
+        counts[table.name] += len(rows)
+
+    # Courses: spread over a few terms, 60 to 120 days long
+    course_days = []
+    rows = []
+    for i in range(courses):
+        course_id = first_course_id + i
+        start_date = date(2023, 1, 9) + timedelta(days=rng.choice([0, 120, 240, 365]))
+        total_days = rng.randint(60, 120)
+        course_days.append(total_days)
+        rows.append({
+            'id': course_id,
+            'course_code': f"SYN{course_id:06d}",
+            'course_name': f"{rng.choice(SUBJECTS)} {100 + course_id % 400}",
+            'instructor': rng.choice(INSTRUCTORS),
+            'start_date': start_date,
+            'end_date': start_date + timedelta(days=total_days - 1),
+        })
+    for i in range(0, len(rows), batch_size):
+        write(Course.__table__, rows[i:i + batch_size])
+
+    # Students, with their performance records and enrollments
+    created_at = datetime(2023, 1, 1)
+    students_rows, records_rows, enrollments_rows = [], [], []
+    for i in range(students):
+        student_id = first_student_id + i
+        students_rows.append({
+            'id': student_id,
+            'student_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'student_email': f"student{student_id}@example.edu",
+            'age': rng.randint(17, 30),
+            'created_at': created_at + timedelta(minutes=i),
+        })
+
+        for course_index in rng.sample(range(courses), enrollments_per_student):
+            grade = rng.choices(grades, weights)[0]
+            share = min(max(rng.gauss(attendance_mean, attendance_stddev), 0.0), 1.0)
+            num_days_present = round(share * course_days[course_index])
+            records_rows.append({
+                'student_id': student_id,
+                'course_id': first_course_id + course_index,
+                'grade': grade,
+                'grade_points': grade_to_points(grade),
+                '_num_days_present': num_days_present,
+            })
+            enrollments_rows.append({
+                'student_id': student_id,
+                'course_id': first_course_id + course_index,
+                '_num_days_present': num_days_present,
+            })
+
+        if len(records_rows) >= batch_size or i == students - 1:
+            write(Student.__table__, students_rows)
+            write(PerformanceRecord.__table__, records_rows)
+            write(Enrollment.__table__, enrollments_rows)
+            students_rows, records_rows, enrollments_rows = [], [], []
+
+    if engine.dialect.name == 'postgresql':
+        # Explicit IDs do not advance the serial sequences, so move them past
+        # the new rows or the next add_student/add_course would reuse an ID
+        with engine.begin() as conn:
+            for table in (Course.__table__, Student.__table__):
+                conn.execute(select(func.setval(func.pg_get_serial_sequence(table.name, 'id'),
+                                                select(func.max(table.c.id)).scalar_subquery())))
+
+    return counts
+
+
 if __name__ == "__main__":
-    populate_mock_data()
+    if len(sys.argv) > 1:
+        import fire
+
+        # e.g. python -m lib.seed synthetic --students=40000 --courses=400 --seed=7
+        fire.Fire({'mock': populate_mock_data, 'synthetic': generate_synthetic_data})
+    else:
+        populate_mock_data()
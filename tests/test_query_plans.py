@@ -0,0 +1,233 @@
+import unittest
+import inspect
+import re
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lib.main import StudentManagementSystem
+from lib.models import Base, Student, Enrollment
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+# Matches a full scan of a table, e.g. "SCAN students" or "SCAN students USING COVERING INDEX ...";
+# SQLite before 3.36 prints "SCAN TABLE students"
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+# Methods that read whole tables on purpose, mapped to the tables they may scan
+EXPECTED_SCANS = {
+    'rebuild_course_stats': {'course_stats', 'performance_records'},
+    'analytics_snapshot': {'performance_records'},
+}
+
+# Public methods that issue no queries worth explaining, and why
+NOT_EXPLAINED = {
+    'init_db': 'only runs schema DDL',
+    'shell': 'interactive; runs the same commands as batch',
+    'cache_stats': 'reads in-memory counters only',
+    'generate_reports': 'runs get_performance_records and rank_students in worker processes',
+    'transaction': 'a context manager; the commands run inside it are explained on their own',
+    'close_sessions': 'only closes sessions',
+}
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Run every public StudentManagementSystem method and EXPLAIN the SQL it issues."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+        self.sms = StudentManagementSystem()
+        self.sms.session = self.session
+
+        # A few rows in each table so every code path has something to find
+        self.session.execute(insert(Student.__table__), [
+            {"student_name": f"Student {i}", "student_email": f"student{i}@example.com", "age": 20 + i % 5}
+            for i in range(1, 6)
+        ])
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.add_course("Physics 101", "PHYS101", "Prof. Johnson", "2023-09-01", "2023-12-15")
+        for student_id, grade in [(1, "A"), (2, "B"), (3, "C")]:
+            self.sms.add_performance_record(student_id, "MATH101", grade)
+        self.session.execute(insert(Enrollment.__table__), [
+            {"student_id": 1, "course_id": 1, "_num_days_present": 0},
+        ])
+        self.session.commit()
+
+        # Start cold so course lookups reach the database and get explained
+        self.sms.course_cache.clear()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.capture)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self.capture)
+        self.session.close()
+        self.engine.dispose()
+
+    def capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+            # Every parameter set of an executemany gets the same plan, so explain the first
+            self.statements.append((statement, parameters[0] if executemany else parameters))
+
+    def write_file(self, name, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def assert_no_full_scans(self, method_name, *args, **kwargs):
+        """Call a method and fail if any statement it issued scans a whole table."""
+        self.statements = []
+        result = getattr(self.sms, method_name)(*args, **kwargs)
+        if inspect.isgenerator(result):
+            list(result)
+
+        self.assertTrue(self.statements, f"{method_name} issued no statements")
+        allowed = EXPECTED_SCANS.get(method_name, set())
+        tables = set(Base.metadata.tables)
+
+        plan_rows = 0
+        with self.engine.connect() as conn:
+            for statement, parameters in self.statements:
+                plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+                plan_rows += len(plan)
+                for row in plan:
+                    detail = row[-1]
+                    match = FULL_SCAN.match(detail)
+                    if match and match.group(1) in tables and match.group(1) not in allowed:
+                        self.fail(f"{method_name} scans {match.group(1)}:\n{statement}\n{detail}")
+        # Only plain INSERT ... VALUES statements have no plan to check
+        if not plan_rows:
+            for statement, _ in self.statements:
+                self.assertRegex(statement.lstrip().upper(), r'^INSERT (?!.*\bSELECT\b)',
+                                 f"{method_name} produced no query plan rows")
+
+    def test_full_scan_pattern_matches_this_sqlite(self):
+        # A pattern that missed this version's plan format would let every scan through
+        with self.engine.connect() as conn:
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN SELECT * FROM students WHERE age > 0").all()
+        self.assertEqual([FULL_SCAN.match(row[-1]).group(1) for row in plan], ["students"])
+
+    def test_every_public_method_is_covered(self):
+        public_methods = {
+            name for name, _ in inspect.getmembers(StudentManagementSystem, inspect.isfunction)
+            if not name.startswith('_')
+        }
+        covered = {
+            name[len('test_'):] for name in dir(self)
+            if name.startswith('test_') and name != 'test_every_public_method_is_covered'
+        }
+        self.assertEqual(public_methods - covered - set(NOT_EXPLAINED), set())
+
+    def test_add_student(self):
+        self.assert_no_full_scans("add_student", "New Student", "new@example.com", 30)
+
+    def test_add_course(self):
+        self.assert_no_full_scans("add_course", "Chemistry 101", "CHEM101", "Prof. Rose", "2023-09-01", "2023-12-15")
+
+    def test_add_performance_record(self):
+        self.assert_no_full_scans("add_performance_record", 4, "MATH101", "B+")
+
+    def test_upsert_student(self):
+        self.assert_no_full_scans("upsert_student", "Student 1", "student1@example.com", 30)
+
+    def test_upsert_performance_record(self):
+        self.assert_no_full_scans("upsert_performance_record", 1, "MATH101", "A-")
+
+    def test_update_student(self):
+        self.assert_no_full_scans("update_student", 1, "Renamed Student")
+
+    def test_update_course(self):
+        self.assert_no_full_scans("update_course", "PHYS101", "Physics 102", "PHYS102")
+
+    def test_delete_student(self):
+        self.assert_no_full_scans("delete_student", 5)
+
+    def test_delete_course(self):
+        self.assert_no_full_scans("delete_course", "PHYS101")
+
+    def test_delete_students(self):
+        self.assert_no_full_scans("delete_students", [4, 5])
+
+    def test_delete_courses(self):
+        self.assert_no_full_scans("delete_courses", "PHYS101")
+
+    def test_get_student_info(self):
+        self.assert_no_full_scans("get_student_info", 1)
+
+    def test_get_student_infos(self):
+        self.assert_no_full_scans("get_student_infos", [1, 2, 3])
+
+    def test_export_transcripts(self):
+        self.assert_no_full_scans("export_transcripts", course_code="MATH101", output=self.write_file("out.txt", ""))
+
+    def test_get_course_info(self):
+        self.assert_no_full_scans("get_course_info", "MATH101")
+
+    def test_get_performance_records(self):
+        self.assert_no_full_scans("get_performance_records", "MATH101")
+
+    def test_iter_performance_records(self):
+        self.assert_no_full_scans("iter_performance_records", "MATH101")
+
+    def test_export_performance_records(self):
+        self.assert_no_full_scans("export_performance_records", "MATH101", output=self.write_file("out.ndjson", ""))
+
+    def test_list_students(self):
+        self.assert_no_full_scans("list_students", limit=2, after=2, min_age=21)
+
+    def test_list_courses(self):
+        self.assert_no_full_scans("list_courses", limit=1, after=1, instructor="Prof. Johnson", active_from="2023-10-01")
+
+    def test_list_performance_records(self):
+        self.assert_no_full_scans("list_performance_records", limit=2, after=1, course_code="MATH101", grade="A,B")
+        self.assert_no_full_scans("list_performance_records", limit=2, after=1, student_id=1)
+
+    def test_search(self):
+        self.assert_no_full_scans("search", "student johnson")
+
+    def test_get_low_attendance(self):
+        self.assert_no_full_scans("get_low_attendance", "MATH101")
+
+    def test_rank_students(self):
+        self.assert_no_full_scans("rank_students", "MATH101", limit=2, after=1)
+
+    def test_get_course_stats(self):
+        self.assert_no_full_scans("get_course_stats", "MATH101")
+
+    def test_rebuild_course_stats(self):
+        self.assert_no_full_scans("rebuild_course_stats")
+
+    def test_analytics_snapshot(self):
+        self.assert_no_full_scans("analytics_snapshot")
+
+    def test_batch(self):
+        path = self.write_file("commands.txt", "get_course_info MATH101\nupdate_student 2 'Renamed Student'\n")
+        self.assert_no_full_scans("batch", path, transaction=True)
+
+    def test_import_students(self):
+        path = self.write_file("students.csv", "name,email,age\nNew Student,new@example.com,30\n")
+        self.assert_no_full_scans("import_students", path)
+
+    def test_import_courses(self):
+        path = self.write_file("courses.csv", "course_code,course_name\nCHEM101,Chemistry 101\n")
+        self.assert_no_full_scans("import_courses", path)
+
+    def test_ingest_attendance(self):
+        path = self.write_file("scans.csv", "student_id,course_code,date\n1,MATH101,2023-09-04\n2,MATH101,2023-09-04\n")
+        self.assert_no_full_scans("ingest_attendance", path)
+
+    def test_import_performance_records(self):
+        path = self.write_file("records.csv", "student_id,course_code,grade\n4,MATH101,B\n")
+        self.assert_no_full_scans("import_performance_records", path)
+        self.assert_no_full_scans("import_performance_records", path, upsert=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
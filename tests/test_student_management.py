@@ -1,14 +1,28 @@
 import unittest
 import sys
 import os
+import json
+import asyncio
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from unittest import mock
 
 # Add the 'lib' directory to the sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # This line should include '..' to go up one level
 
 # Now you can import your modules from the 'lib' directory
 from lib.main import StudentManagementSystem  # Update this import
-from lib.models import Student, Course, PerformanceRecord  # Update this import
-from sqlalchemy import create_engine
+from lib.db import load_settings, engine_options, create_engine_from_config, create_read_only_engine, get_read_database_url
+from lib.async_system import AsyncStudentManagementSystem
+from lib.cache import LRUCache
+from lib.seed import generate_synthetic_data
+from lib.profiling import QueryProfiler, extract_profile_flag, profile_command
+from lib.models import Student, Course, PerformanceRecord, CourseStats, Enrollment  # Update this import
+from sqlalchemy import create_engine, event, insert, inspect
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 
 # Create an in-memory SQLite database for testing
@@ -185,6 +199,50 @@ class TestStudentManagement(unittest.TestCase):
         expected_non_existent_output = f"Student with ID {non_existent_student_id} not found."
         self.assertEqual(non_existent_output, expected_non_existent_output)
 
+        # An ID that is not a number cannot match a student either
+        self.assertEqual(self.sms.get_student_info("abc"), "Student with ID abc not found.")
+        self.assertEqual([info["student_id"] for info in self.sms.get_student_infos("abc,1")], [1])
+
+
+    def test_get_student_infos_uses_constant_queries(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.add_course("Physics 101", "PHYS101", "Prof. Johnson", "2023-09-01", "2023-12-15")
+        for student_id in range(1, 31):
+            self.sms.add_student(f"Student {student_id}", f"student{student_id}@example.com", 20)
+            self.sms.add_performance_record(student_id, "MATH101", "A")
+            if student_id % 3 == 0:
+                self.sms.add_performance_record(student_id, "PHYS101", "B")
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            infos = self.sms.get_student_infos(list(range(30, 0, -1)) + [999])
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual([info["student_id"] for info in infos], list(range(30, 0, -1)))
+        self.assertEqual(infos[0]["courses"], [
+            {"course_name": "Math 101", "course_code": "MATH101", "grade": "A"},
+            {"course_name": "Physics 101", "course_code": "PHYS101", "grade": "B"},
+        ])
+        self.assertEqual(infos[0]["transcript"], self.sms.get_student_info(30))
+        self.assertTrue(infos[0]["transcript"].endswith("- Physics 101 (Code: PHYS101), Grade: B\n"))
+
+        # Smaller batches cost two queries per batch
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            self.sms.get_student_infos("1,2,3,4,5", batch_size=2)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        self.assertEqual(len(statements), 6)
+
+        path = self.write_import_file("transcripts.ndjson", "")
+        self.sms.export_transcripts(course_code="PHYS101", output=path, file_format="ndjson")
+        with open(path) as f:
+            self.assertEqual([json.loads(line)["student_id"] for line in f], list(range(3, 31, 3)))
 
     def test_get_course_info(self):
         # Add a course to the database using the StudentManagementSystem
@@ -271,6 +329,45 @@ class TestStudentManagement(unittest.TestCase):
             self.assertEqual(student_info[i][1], expected_grade)  # Check the grade
 
 
+    def test_rank_students_by_grade_points(self):
+        course_code = "MATH101"
+        self.sms.add_course("Math 101", course_code, "Dr. Smith", "2023-09-01", "2023-12-15")
+        grades = ["D", "A", "B+", "B", "A", None, "B-"]
+        for student_id, grade in enumerate(grades, start=1):
+            self.sms.add_student(f"Student {student_id}", f"student{student_id}@example.com", 20)
+            self.sms.add_performance_record(student_id, course_code, grade)
+
+        output = self.sms.rank_students(course_code)
+        self.assertEqual([(row.grade, row.rank, row.student_id) for row in output], [
+            ("A", 1, 2), ("A", 1, 5), ("B+", 3, 3), ("B", 4, 4), ("B-", 5, 7), ("D", 6, 1), (None, 7, 6),
+        ])
+
+        dense = self.sms.rank_students(course_code, dense=True)
+        self.assertEqual([row.rank for row in dense], [1, 1, 2, 3, 4, 5, 6])
+
+        # Page through the ranking with limit and the last student ID seen
+        first_page = self.sms.rank_students(course_code, limit=3)
+        second_page = self.sms.rank_students(course_code, limit=3, after=first_page[-1].student_id)
+        self.assertEqual([row.student_id for row in first_page + second_page], [2, 5, 3, 4, 7, 1])
+        self.assertEqual(self.sms.rank_students(course_code, limit=3, after=5)[0].student_id, 3)
+
+    def test_grade_points_follow_grade(self):
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.add_performance_record(1, "MATH101", "B+")
+
+        record = session.query(PerformanceRecord).first()
+        self.assertEqual(record.grade_points, 3.3)
+
+        record.grade = "c"
+        session.commit()
+        self.assertEqual(session.query(PerformanceRecord.grade_points).scalar(), 2.0)
+
+        self.sms.add_course("Physics 101", "PHYS101", "Prof. Johnson", "2023-09-01", "2023-12-15")
+        path = self.write_import_file("records.csv", "student_id,course_code,grade\n1,PHYS101,A-\n")
+        self.sms.import_performance_records(path)
+        self.assertEqual(session.query(PerformanceRecord.grade_points).filter_by(grade="A-").scalar(), 3.7)
+
     def test_rank_students_invalid_course_code(self):
         # Test ranking with an invalid course code
         invalid_course_code = "INVALIDCODE"
@@ -282,6 +379,929 @@ class TestStudentManagement(unittest.TestCase):
         # Check that the output matches the expected error message
         self.assertEqual(output, expected_error_message)
 
+    def test_course_stats_follow_record_changes(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-09-10")
+        for i, grade in enumerate(["A", "A", "B", "Z"], start=1):
+            self.sms.add_student(f"Student {i}", f"student{i}@example.com", 20)
+            self.sms.add_performance_record(i, "MATH101", grade)
+
+        stats = self.sms.get_course_stats("MATH101")
+        self.assertEqual(stats["records"], 4)
+        self.assertEqual(stats["grades"], {"A": 2, "B": 1, "Z": 1})
+        # "Z" has no grade points, so the mean covers the other three records
+        self.assertAlmostEqual(stats["mean_grade_points"], 11.0 / 3)
+        self.assertEqual(stats["mean_attendance"], 0)
+
+        record = session.query(PerformanceRecord).filter_by(student_id=2).one()
+        record.grade = "B"
+        record.num_days_present = 5
+        session.delete(session.query(PerformanceRecord).filter_by(student_id=4).one())
+        session.commit()
+
+        stats = self.sms.get_course_stats("MATH101")
+        self.assertEqual(stats["grades"], {"A": 1, "B": 2})
+        self.assertAlmostEqual(stats["mean_grade_points"], 10.0 / 3)
+        # 5 of 10 days for one of three records
+        self.assertAlmostEqual(stats["mean_attendance"], 50.0 / 3)
+        self.assertEqual(self.sms.rebuild_course_stats()["drift"], [])
+
+    def test_course_stats_without_course_dates(self):
+        path = self.write_import_file("courses.csv", "course_code,course_name\nART101,Art 101\n")
+        self.sms.import_courses(path)
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.sms.add_performance_record(1, "ART101", "A")
+
+        stats = self.sms.get_course_stats("ART101")
+        self.assertEqual(stats["records"], 1)
+        # Like PerformanceRecord.attendance, a course without dates has no days to attend
+        self.assertEqual(stats["mean_attendance"], 0)
+
+    def test_rebuild_course_stats_reports_drift(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.sms.add_performance_record(1, "MATH101", "A")
+        session.query(CourseStats).update({CourseStats.record_count: 7})
+        session.commit()
+
+        report = self.sms.rebuild_course_stats("MATH101")
+
+        self.assertEqual(report["rows"], 1)
+        self.assertEqual(report["drift"], [
+            {"course_id": 1, "grade": "A", "column": "record_count", "stored": 7, "actual": 1},
+        ])
+        self.assertEqual(self.sms.get_course_stats("MATH101")["records"], 1)
+
+    def test_analytics_snapshot(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-09-10")
+        self.sms.add_course("Physics 101", "PHYS101", "Dr. Brown", "2023-09-01", "2023-09-05")
+        for i, (grade, days) in enumerate([("A", 10), ("B", 5), ("C", 0), ("Z", 2)], start=1):
+            self.sms.add_student(f"Student {i}", f"student{i}@example.com", 20)
+            self.sms.add_performance_record(i, "MATH101", grade)
+            session.query(PerformanceRecord).filter_by(student_id=i).one().num_days_present = days
+        self.sms.add_performance_record(1, "PHYS101", "B")
+        session.commit()
+
+        snapshot = self.sms.analytics_snapshot()
+        math_id = self.sms._find_course("MATH101").id
+
+        self.assertEqual(len(snapshot), 5)
+        self.assertEqual(snapshot.nbytes, 5 * 25)
+        self.assertEqual(snapshot.count(math_id), 4)
+        self.assertEqual(snapshot.grade_histogram(), {"A": 1, "B": 2, "C": 1, "Z": 1})
+        # "Z" has no grade points and is left out of the aggregates
+        self.assertAlmostEqual(snapshot.mean("grade_points", math_id), 3.0)
+        self.assertAlmostEqual(snapshot.mean("grade_points", math_id), self.sms.get_course_stats("MATH101")["mean_grade_points"])
+        self.assertAlmostEqual(snapshot.mean("attendance", math_id), self.sms.get_course_stats("MATH101")["mean_attendance"])
+        self.assertEqual(snapshot.percentile("grade_points", 50, math_id), 3.0)
+        self.assertEqual(snapshot.percentile("attendance", 25, math_id), 15.0)
+        self.assertAlmostEqual(snapshot.correlation(course_id=math_id), 1.0)
+        self.assertEqual(snapshot.course_means("days_present"), {math_id: 4.25, math_id + 1: 0.0})
+
+        only_physics = self.sms.analytics_snapshot("PHYS101")
+        self.assertEqual(only_physics.grade_histogram(), {"B": 1})
+        self.assertIsNone(only_physics.correlation())
+
+
+    def write_import_file(self, name, content):
+        # Write an import file into a temporary directory removed after the test
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_import_students_reports_duplicate_emails(self):
+        self.sms.add_student("John Doe", "john@example.com", 25)
+
+        path = self.write_import_file("students.csv", (
+            "student_name,student_email,age\n"
+            "Jane Smith,jane@example.com,22\n"
+            "John Again,john@example.com,30\n"
+            "Bob Johnson,bob@example.com,not-a-number\n"
+            "Jane Twin,jane@example.com,22\n"
+            "Alice Brown,alice@example.com,\n"
+        ))
+
+        report = self.sms.import_students(path, chunk_size=2)
+
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual([error["line"] for error in report["errors"]], [3, 4, 5])
+        self.assertEqual(session.query(Student).count(), 3)
+        alice = session.query(Student).filter_by(student_email="alice@example.com").first()
+        self.assertIsNone(alice.age)
+        self.assertIsNotNone(alice.created_at)
+
+    def test_import_courses_and_performance_records(self):
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+
+        courses_path = self.write_import_file("courses.jsonl", "\n".join([
+            json.dumps({"course_code": "PHYS101", "course_name": "Physics 101", "instructor": "Prof. Johnson",
+                        "start_date": "2023-09-01", "end_date": "2023-12-15"}),
+            json.dumps({"course_code": "MATH101", "course_name": "Math Again"}),
+            "not json",
+        ]))
+        report = self.sms.import_courses(courses_path)
+
+        self.assertEqual(report["inserted"], 1)
+        self.assertEqual([error["line"] for error in report["errors"]], [2, 3])
+
+        records_path = self.write_import_file("records.csv", (
+            "student_id,course_code,grade,num_days_present\n"
+            "1,MATH101,A,10\n"
+            "1,PHYS101,B,\n"
+            "1,NOPE101,C,3\n"
+            "99,MATH101,D,3\n"
+        ))
+        report = self.sms.import_performance_records(records_path)
+
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual(report["errors"], [
+            {"line": 4, "error": "Course with code NOPE101 not found."},
+            {"line": 5, "error": "Student with ID 99 not found."},
+        ])
+        records = session.query(PerformanceRecord).order_by(PerformanceRecord.id).all()
+        self.assertEqual([(r.course.course_code, r.grade, r.num_days_present) for r in records],
+                         [("MATH101", "A", 10), ("PHYS101", "B", 0)])
+
+    def test_ingest_attendance_is_idempotent(self):
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.sms.add_student("Jane Doe", "jane@example.com", 22)
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-09-10")
+        self.sms.add_performance_record(1, "MATH101", "A")
+        session.execute(insert(Enrollment.__table__), [{"student_id": 1, "course_id": 1, "_num_days_present": 2}])
+        session.commit()
+
+        path = self.write_import_file("scans.csv", (
+            "student_id,course_code,date\n"
+            "1,MATH101,2023-09-01\n"
+            "1,MATH101,2023-09-01\n"
+            "1,MATH101,2023-09-02\n"
+            "2,MATH101,2023-09-01\n"
+            "1,NOPE101,2023-09-01\n"
+            "1,MATH101,yesterday\n"
+        ))
+        report = self.sms.ingest_attendance(path, chunk_size=2)
+
+        self.assertEqual((report["applied"], report["duplicates"]), (2, 1))
+        self.assertEqual([error["line"] for error in report["errors"]], [5, 6, 7])
+        self.assertEqual(session.query(PerformanceRecord).one().num_days_present, 2)
+        self.assertEqual(session.query(Enrollment._num_days_present).scalar(), 4)
+        self.assertEqual(self.sms.get_course_stats("MATH101")["mean_attendance"], 20.0)
+
+        # Running the same file again counts nothing twice
+        report = self.sms.ingest_attendance(path)
+        self.assertEqual((report["applied"], report["duplicates"]), (0, 3))
+        session.expire_all()
+        self.assertEqual(session.query(PerformanceRecord).one().num_days_present, 2)
+
+    def test_ingest_attendance_retries_only_the_locked_chunk(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-09-10")
+        for student_id in range(1, 4):
+            self.sms.add_student(f"Student {student_id}", f"student{student_id}@example.com", 20)
+            self.sms.add_performance_record(student_id, "MATH101", "A")
+        path = self.write_import_file("scans.csv", "student_id,course_code,date\n" + "".join(
+            f"{student_id},MATH101,2023-09-01\n" for student_id in range(1, 4)
+        ))
+
+        sms = StudentManagementSystem(session=session, lock_retries=2, lock_retry_backoff_ms=0)
+        commit, commits = sms._commit, []
+
+        def commit_locked_once():
+            # The second chunk's first commit finds the database locked
+            commits.append(1)
+            if len(commits) == 2:
+                raise OperationalError("COMMIT", {}, sqlite3.OperationalError("database is locked"))
+            commit()
+
+        with mock.patch.object(sms, "_commit", side_effect=commit_locked_once):
+            report = sms.ingest_attendance(path, chunk_size=1)
+
+        self.assertEqual((report["applied"], report["duplicates"], len(commits)), (3, 0, 4))
+        session.expire_all()
+        self.assertEqual([r.num_days_present for r in session.query(PerformanceRecord).order_by(PerformanceRecord.student_id)],
+                         [1, 1, 1])
+
+    def test_upserts_on_other_databases(self):
+        from sqlalchemy.dialects import mysql
+        from lib.main import _upsert_students
+
+        fake_session = mock.Mock()
+        fake_session.get_bind.return_value.dialect = mysql.dialect()
+        self.assertIn("ON DUPLICATE KEY UPDATE student_name = VALUES(student_name)",
+                      str(_upsert_students(fake_session).compile(dialect=mysql.dialect())))
+
+        fake_session.get_bind.return_value.dialect = mock.Mock()
+        fake_session.get_bind.return_value.dialect.name = "mssql"
+        with self.assertRaisesRegex(ValueError, "SQLite, PostgreSQL or MySQL"):
+            _upsert_students(fake_session)
+
+    def test_upserts_update_existing_rows(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.upsert_student("John Doe", "john@example.com", 25)
+        self.sms.upsert_student("Johnny Doe", "john@example.com")
+        self.sms.upsert_performance_record(1, "MATH101", "B")
+        session.query(PerformanceRecord).update({PerformanceRecord._num_days_present: 4})
+        session.commit()
+        self.sms.upsert_performance_record(1, "MATH101", "A")
+        session.expire_all()
+
+        student = session.query(Student).one()
+        self.assertEqual((student.student_name, student.age), ("Johnny Doe", 25))
+        record = session.query(PerformanceRecord).one()
+        self.assertEqual((record.grade, record.grade_points, record.num_days_present), ("A", 4.0, 4))
+        self.assertEqual(self.sms.get_course_stats("MATH101")["grades"], {"A": 1})
+
+        with self.assertRaises(Exception):
+            self.sms.add_performance_record(1, "MATH101", "C")
+        session.rollback()
+
+    def test_import_upsert_is_repeatable(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        students = self.write_import_file("students.csv", "name,email,age\nJohn Doe,john@example.com,25\nJane Doe,jane@example.com,22\n")
+        records = self.write_import_file("records.csv", "student_id,course_code,grade\n1,MATH101,B\n2,MATH101,C\n1,MATH101,A\n")
+
+        for _ in range(2):
+            self.assertEqual(self.sms.import_students(students, upsert=True)["inserted"], 2)
+            report = self.sms.import_performance_records(records, upsert=True)
+            self.assertEqual(report["inserted"], 2)
+            self.assertEqual([error["line"] for error in report["errors"]], [4])
+
+        self.assertEqual(session.query(Student).count(), 2)
+        self.assertEqual(session.query(PerformanceRecord).count(), 2)
+
+        report = self.sms.import_performance_records(records)
+        self.assertEqual(report["inserted"], 0)
+        self.assertEqual([error["line"] for error in report["errors"]], [2, 3, 4])
+
+    def test_list_students_pages_with_cursor(self):
+        for i in range(1, 8):
+            self.sms.add_student(f"Student {i}", f"student{i}@example.com", 18 + i)
+
+        pages, after = [], None
+        while True:
+            page = self.sms.list_students(limit=3, after=after, min_age=20, max_age=24)
+            pages.append([student["student_id"] for student in page["students"]])
+            after = page["next_cursor"]
+            if after is None:
+                break
+
+        self.assertEqual(pages, [[2, 3, 4], [5, 6]])
+        self.assertEqual(self.sms.list_students(limit=10)["students"][0],
+                         {"student_id": 1, "name": "Student 1", "email": "student1@example.com", "age": 19})
+
+    def test_list_courses_and_performance_records_filters(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.add_course("Physics 101", "PHYS101", "Prof. Johnson", "2024-01-08", "2024-04-30")
+        self.sms.add_course("Math 102", "MATH102", "Dr. Smith", "2024-01-08", "2024-04-30")
+        for student_id in range(1, 4):
+            self.sms.add_student(f"Student {student_id}", f"student{student_id}@example.com", 20)
+            self.sms.add_performance_record(student_id, "MATH101", "ABC"[student_id - 1])
+            self.sms.add_performance_record(student_id, "PHYS101", "B")
+
+        courses = self.sms.list_courses(instructor="Dr. Smith")["courses"]
+        self.assertEqual([course["course_code"] for course in courses], ["MATH101", "MATH102"])
+        courses = self.sms.list_courses(active_from="2024-01-01", active_until="2024-02-01")["courses"]
+        self.assertEqual([course["course_code"] for course in courses], ["PHYS101", "MATH102"])
+
+        page = self.sms.list_performance_records(limit=1, course_code="MATH101", grade="A,B")
+        self.assertEqual([(r["student_id"], r["grade"]) for r in page["records"]], [(1, "A")])
+        page = self.sms.list_performance_records(limit=1, after=page["next_cursor"], course_code="MATH101", grade="A,B")
+        self.assertEqual([(r["student_id"], r["grade"]) for r in page["records"]], [(2, "B")])
+        self.assertIsNone(page["next_cursor"])
+
+        records = self.sms.list_performance_records(student_id=3)["records"]
+        self.assertEqual([r["course_code"] for r in records], ["MATH101", "PHYS101"])
+        self.assertEqual(self.sms.list_performance_records(course_code="NOPE"), "Course with code NOPE is not found.")
+
+    def test_search_finds_partial_names_and_follows_changes(self):
+        self.sms.add_student("Jonathan Smith", "jsmith@example.com", 20)
+        self.sms.add_student("Ann Jones", "ann@uni.edu", 21)
+        self.sms.add_course("Math 101", "MATH101", "Dr. Jonas Weber", "2023-09-01", "2023-12-15")
+
+        results = self.sms.search("jon")
+        self.assertEqual({s["name"] for s in results["students"]}, {"Jonathan Smith", "Ann Jones"})
+        self.assertEqual([c["course_code"] for c in results["courses"]], ["MATH101"])
+        self.assertEqual([s["name"] for s in self.sms.search("smith example", scope="students")["students"]],
+                         ["Jonathan Smith"])
+
+        self.sms.update_student(2, "Ann Miller")
+        self.sms.delete_student(1)
+        self.assertEqual(self.sms.search("jon", scope="students")["students"], [])
+        self.assertEqual([s["student_id"] for s in self.sms.search("mill")["students"]], [2])
+        self.assertEqual(self.sms.search("jo"), "Search terms need at least 3 characters each.")
+
+    def test_search_without_trigram_support_uses_like(self):
+        # SQLite before 3.34, or built without FTS5, gets no search index
+        plain_engine = create_engine("sqlite://")
+        self.addCleanup(plain_engine.dispose)
+        with mock.patch("lib.models.sqlite_trigram_available", return_value=False), \
+                mock.patch("lib.main.sqlite_trigram_available", return_value=False):
+            Student.metadata.create_all(plain_engine)
+            self.assertNotIn("students_fts", inspect(plain_engine).get_table_names())
+
+            sms = StudentManagementSystem(session=sessionmaker(bind=plain_engine)())
+            self.addCleanup(sms.session.close)
+            sms.add_student("Jonathan Smith", "jsmith@example.com", 20)
+            sms.add_course("Math 101", "MATH101", "Dr. Jonas Weber", "2023-09-01", "2023-12-15")
+            results = sms.search("jon")
+
+        self.assertEqual([s["name"] for s in results["students"]], ["Jonathan Smith"])
+        self.assertEqual([c["course_code"] for c in results["courses"]], ["MATH101"])
+
+    def test_export_performance_records_streams_rows(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-09-10")
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.sms.add_student("Jane Smith", "jane@example.com", 22)
+        self.sms.add_performance_record(1, "MATH101", "A")
+        self.sms.add_performance_record(2, "MATH101", "B")
+        session.query(PerformanceRecord).filter_by(student_id=2).first().num_days_present = 5
+        session.commit()
+
+        records = self.sms.iter_performance_records("MATH101", batch_size=1)
+        self.assertEqual(next(records), {"student_id": 1, "student_name": "John Doe", "attendance": 0.0, "grade": "A"})
+        records.close()
+
+        path = self.write_import_file("records.ndjson", "")
+        self.sms.export_performance_records("MATH101", output=path, batch_size=1)
+        with open(path) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(rows[1], {"student_id": 2, "student_name": "Jane Smith", "attendance": 50.0, "grade": "B"})
+
+        self.sms.export_performance_records("MATH101", output=path, file_format="csv")
+        with open(path) as f:
+            self.assertEqual(f.read().splitlines(), [
+                "student_id,student_name,attendance,grade",
+                "1,John Doe,0.0,A",
+                "2,Jane Smith,50.0,B",
+            ])
+
+        self.assertEqual(self.sms.export_performance_records("NOPE101"), "Course with code NOPE101 is not found.")
+        self.assertEqual(list(self.sms.iter_performance_records("NOPE101")), [])
+
+    def test_batch_runs_commands_in_one_process(self):
+        path = self.write_import_file("commands.txt", "\n".join([
+            "# set up a course and two students",
+            "add_course 'Math 101' MATH101 'Dr. Smith' 2023-09-01 2023-12-15",
+            "add_student 'John Doe' john@example.com 25",
+            "add-student --name='Jane Smith' --email jane@example.com --age=22",
+            "",
+            "add_performance_record 1 MATH101 A",
+            "no_such_command",
+            "add_student 'John Again' john@example.com 30",
+            "add_performance_record 2 MATH101 B",
+        ]))
+
+        summary = self.sms.batch(path)
+
+        self.assertEqual(summary, {"commands": 5, "errors": 2, "committed": True})
+        self.assertEqual(session.query(Student).count(), 2)
+        self.assertEqual(session.query(PerformanceRecord).count(), 2)
+        self.assertEqual(session.query(Student).filter_by(id=2).one().age, 22)
+
+    def test_batch_transaction_is_all_or_nothing(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        path = self.write_import_file("commands.txt", "\n".join([
+            "add_student 'John Doe' john@example.com 25",
+            "add_performance_record 1 MATH101 A",
+            "add_student 'John Again' john@example.com 30",
+        ]))
+
+        summary = self.sms.batch(path, transaction=True)
+
+        self.assertEqual(summary, {"commands": 2, "errors": 1, "committed": False})
+        self.assertEqual(session.query(Student).count(), 0)
+        self.assertEqual(session.query(PerformanceRecord).count(), 0)
+
+        # Without the failing line the same batch commits as one unit
+        with open(path, "w") as f:
+            f.write("add_student 'John Doe' john@example.com 25\nadd_performance_record 1 MATH101 A\n")
+        self.assertTrue(self.sms.batch(path, transaction=True)["committed"])
+        self.assertEqual(session.query(PerformanceRecord).count(), 1)
+
+    def test_transaction_commits_once(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        commits = []
+        listener = lambda session: commits.append(session)
+        event.listen(session, "after_commit", listener)
+        self.addCleanup(event.remove, session, "after_commit", listener)
+
+        with self.sms.transaction():
+            for i in range(1, 6):
+                self.sms.add_student(f"Student {i}", f"student{i}@example.com", 20)
+                self.sms.add_performance_record(i, "MATH101", "A")
+            with self.sms.transaction():
+                self.sms.update_student(1, "Renamed Student")
+
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(session.query(PerformanceRecord).count(), 5)
+        self.assertEqual(session.get(Student, 1).student_name, "Renamed Student")
+
+    def test_transaction_rolls_back_on_error(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+
+        with self.assertRaises(Exception):
+            with self.sms.transaction():
+                self.sms.add_student("John Doe", "john@example.com", 25)
+                self.sms.add_performance_record(1, "MATH101", "A")
+                self.sms.add_student("John Again", "john@example.com", 30)
+
+        self.assertEqual(session.query(Student).count(), 0)
+        self.assertEqual(session.query(PerformanceRecord).count(), 0)
+        self.assertFalse(self.sms._state.defer_commit)
+        # The system keeps working after the rollback
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.assertEqual(session.query(Student).count(), 1)
+
+    def test_batch_joins_enclosing_transaction(self):
+        path = self.write_import_file("commands.txt", "add_student 'Jane Smith' jane@example.com 22\n")
+
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort):
+            with self.sms.transaction():
+                self.sms.add_student("John Doe", "john@example.com", 25)
+                for transaction in (False, True):
+                    summary = self.sms.batch(path, transaction=transaction)
+                    self.assertEqual(summary, {"commands": 1, "errors": 0, "committed": False})
+                    self.assertTrue(self.sms._state.defer_commit)
+                    session.query(Student).filter_by(student_email="jane@example.com").delete()
+                raise Abort()
+
+        self.assertEqual(session.query(Student).count(), 0)
+
+    def test_course_cache_hits_and_invalidation(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        for student_id in range(1, 4):
+            self.sms.add_student(f"Student {student_id}", f"student{student_id}@example.com", 20)
+            self.sms.add_performance_record(student_id, "MATH101", "A")
+
+        self.assertEqual(self.sms.cache_stats()["misses"], 1)
+        self.assertEqual(self.sms.cache_stats()["hits"], 2)
+
+        # Renaming the course drops the old code from the cache
+        self.sms.update_course("MATH101", "Mathematics 101", "MATH101A")
+        self.assertEqual(self.sms.get_course_info("MATH101"), "Course with code MATH101 is not found.")
+        self.assertIn("Course Name: Mathematics 101\n", self.sms.get_course_info("MATH101A"))
+
+        self.sms.add_course("Physics 101", "PHYS101", "Prof. Johnson", "2023-09-01", "2023-12-15")
+        self.sms.get_course_info("PHYS101")
+        self.sms.delete_course("PHYS101")
+        self.assertEqual(self.sms.get_course_info("PHYS101"), "Course with code PHYS101 is not found.")
+
+    def test_course_cache_survives_outside_changes(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.get_course_info("MATH101")
+
+        # Another writer renames the course behind the cache's back
+        session.query(Course).filter_by(course_code="MATH101").update({"course_code": "MATH102"})
+        session.commit()
+
+        self.sms.update_course("MATH101", "Math 101", "MATH103")
+        self.assertIsNone(session.query(Course).filter_by(course_code="MATH103").first())
+
+    def test_lru_cache_eviction_and_ttl(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        expiring = LRUCache(ttl=0.01)
+        expiring.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(expiring.get("a"))
+
+    def test_attendance_sql_expression(self):
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-09-10")
+        self.sms.add_course("Physics 101", "PHYS101", "Prof. Johnson", "2023-09-01", "2023-09-03")
+        for student_id, (name, email) in enumerate([("John Doe", "john@example.com"),
+                                                    ("Jane Smith", "jane@example.com"),
+                                                    ("Bob Johnson", "bob@example.com")], start=1):
+            self.sms.add_student(name, email, 20)
+            self.sms.add_performance_record(student_id, "MATH101", "B")
+            self.sms.add_performance_record(student_id, "PHYS101", "B")
+
+        for record in session.query(PerformanceRecord).all():
+            record.num_days_present = {1: 9, 2: 7, 3: 1}[record.student_id]
+        session.commit()
+
+        # The SQL expression agrees with the Python implementation
+        for record in session.query(PerformanceRecord).all():
+            sql_attendance = session.query(PerformanceRecord.attendance).filter_by(id=record.id).scalar()
+            self.assertAlmostEqual(sql_attendance, record.attendance)
+
+        self.assertEqual(self.sms.get_low_attendance("MATH101"), [
+            {"student_id": 3, "student_name": "Bob Johnson", "attendance": 10.0},
+            {"student_id": 2, "student_name": "Jane Smith", "attendance": 70.0},
+        ])
+        self.assertEqual(self.sms.get_low_attendance("PHYS101", threshold=50), [
+            {"student_id": 3, "student_name": "Bob Johnson", "attendance": (1 / 3) * 100},
+        ])
+        self.assertEqual([row["attendance"] for row in self.sms.get_performance_records("MATH101")], [90.0, 70.0, 10.0])
+
+
+class TestDatabaseConfig(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+        # Keep SMS_* variables from the surrounding environment out of these tests
+        saved = {key: value for key, value in os.environ.items() if key.startswith("SMS_")}
+        for key in saved:
+            del os.environ[key]
+        self.addCleanup(os.environ.update, saved)
+
+    def test_settings_from_config_file_and_environment(self):
+        config_file = os.path.join(self.directory, "sms.ini")
+        with open(config_file, "w") as f:
+            f.write("[database]\nurl = postgresql://sms@db/sms\npool_size = 20\n")
+
+        settings = load_settings(config_file)
+        self.assertEqual(settings["database_url"], "postgresql://sms@db/sms")
+        self.assertEqual(engine_options(settings["database_url"], settings)["pool_size"], 20)
+
+        os.environ["SMS_DATABASE_URL"] = "sqlite:///other.db"
+        self.addCleanup(os.environ.pop, "SMS_DATABASE_URL")
+        settings = load_settings(config_file)
+        self.assertEqual(settings["database_url"], "sqlite:///other.db")
+        self.assertNotIn("pool_size", engine_options(settings["database_url"], settings))
+
+    def test_sqlite_connections_are_tuned(self):
+        url = "sqlite:///" + os.path.join(self.directory, "tuned.db")
+        engine = create_engine_from_config(url, settings=load_settings(os.path.join(self.directory, "missing.ini")))
+        self.addCleanup(engine.dispose)
+
+        with engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(conn.exec_driver_sql("PRAGMA synchronous").scalar(), 1)
+            self.assertEqual(conn.exec_driver_sql("PRAGMA busy_timeout").scalar(), 5000)
+            self.assertEqual(conn.exec_driver_sql("PRAGMA mmap_size").scalar(), 256 * 1024 * 1024)
+            self.assertEqual(conn.exec_driver_sql("PRAGMA foreign_keys").scalar(), 1)
+
+    def test_init_db_creates_tables(self):
+        engine = create_engine("sqlite:///" + os.path.join(self.directory, "fresh.db"))
+        self.addCleanup(engine.dispose)
+
+        sms = StudentManagementSystem(session=sessionmaker(bind=engine)())
+        sms.init_db()
+        sms.session.close()
+
+        self.assertTrue({"students", "courses", "performance_records", "enrollments"} <= set(inspect(engine).get_table_names()))
+
+    def test_read_only_engine_cannot_write(self):
+        path = os.path.join(self.directory, "readonly.db")
+        StudentManagementSystem(session=sessionmaker(bind=create_engine("sqlite:///" + path))()).init_db()
+
+        engine = create_read_only_engine("sqlite:///" + path)
+        self.addCleanup(engine.dispose)
+        with engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("SELECT COUNT(*) FROM students").scalar(), 0)
+            with self.assertRaises(OperationalError):
+                conn.exec_driver_sql("INSERT INTO students (student_name, student_email) VALUES ('A', 'a@example.com')")
+
+    def test_read_database_url(self):
+        settings = load_settings(os.path.join(self.directory, "missing.ini"))
+        url = "sqlite:///" + os.path.join(self.directory, "sms.db")
+        # A file that does not exist yet cannot be opened read-only
+        self.assertIsNone(get_read_database_url({**settings, "database_url": url}))
+        open(os.path.join(self.directory, "sms.db"), "w").close()
+        self.assertEqual(str(get_read_database_url({**settings, "database_url": url})), url)
+        self.assertIsNone(get_read_database_url({**settings, "database_url": "sqlite:///:memory:"}))
+        self.assertIsNone(get_read_database_url({**settings, "database_url": url, "route_reads": "false"}))
+        self.assertEqual(get_read_database_url({**settings, "read_database_url": "postgresql://sms@replica/sms"}),
+                         "postgresql://sms@replica/sms")
+
+    def test_reads_are_routed_to_read_session(self):
+        url = "sqlite:///" + os.path.join(self.directory, "routed.db")
+        engine = create_engine_from_config(url)
+        read_engine = create_read_only_engine(url)
+        self.addCleanup(engine.dispose)
+        self.addCleanup(read_engine.dispose)
+        sms = StudentManagementSystem(session=sessionmaker(bind=engine)(),
+                                      read_session=sessionmaker(bind=read_engine)())
+        self.addCleanup(sms.session.close)
+        self.addCleanup(sms.read_session.close)
+        sms.init_db()
+
+        sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        sms.add_student("John Doe", "john@example.com", 25)
+        sms.add_performance_record(1, "MATH101", "A")
+        sms.course_cache.clear()
+
+        with QueryProfiler(read_engine) as reads, QueryProfiler(engine) as primary:
+            self.assertIn("Math 101", sms.get_course_info("MATH101"))
+            self.assertEqual(len(sms.get_performance_records("MATH101")), 1)
+            self.assertEqual(sms.rank_students("MATH101")[0].student_name, "John Doe")
+
+        self.assertTrue(reads.statements)
+        self.assertEqual(primary.statements, [])
+        # The read transaction is ended after each command
+        self.assertFalse(sms.read_session.in_transaction())
+
+    def test_reads_are_pinned_to_primary_after_write(self):
+        url = "sqlite:///" + os.path.join(self.directory, "pinned.db")
+        engine = create_engine_from_config(url)
+        read_engine = create_read_only_engine(url)
+        self.addCleanup(engine.dispose)
+        self.addCleanup(read_engine.dispose)
+        sms = StudentManagementSystem(session=sessionmaker(bind=engine)(),
+                                      read_session=sessionmaker(bind=read_engine)(),
+                                      read_your_writes_seconds=60)
+        self.addCleanup(sms.session.close)
+        self.addCleanup(sms.read_session.close)
+        sms.init_db()
+
+        with QueryProfiler(read_engine) as reads:
+            self.assertEqual(sms.list_students()["students"], [])
+            sms.add_student("John Doe", "john@example.com", 25)
+            self.assertIn("John Doe", sms.get_student_info(1))
+        self.assertEqual(len(reads.statements), 1)
+
+    def test_threads_get_their_own_sessions(self):
+        engine = create_engine_from_config("sqlite:///" + os.path.join(self.directory, "threads.db"))
+        self.addCleanup(engine.dispose)
+        factory = sessionmaker(bind=engine)
+        StudentManagementSystem(session=factory()).init_db()
+
+        with mock.patch("lib.main.get_session_factory", return_value=factory), \
+                mock.patch("lib.main.get_read_session_factory", return_value=None):
+            sms = StudentManagementSystem()
+            sessions, errors = [], []
+
+            def work(thread):
+                try:
+                    own = sms.session
+                    sessions.append(own)
+                    for i in range(20):
+                        sms.add_student(f"Student {thread}-{i}", f"student{thread}-{i}@example.com", 20)
+                        sms.get_student_info(1)
+                    self.assertIs(sms.session, own)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    sms.close_sessions()
+
+            threads = [threading.Thread(target=work, args=(thread,)) for thread in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len({id(session) for session in sessions}), 8)
+        with engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("SELECT COUNT(*) FROM students").scalar(), 160)
+
+    def test_write_commands_retry_on_lock(self):
+        path = os.path.join(self.directory, "locked.db")
+        settings = {**load_settings(os.path.join(self.directory, "missing.ini")), "sqlite_busy_timeout": "0"}
+        engine = create_engine_from_config("sqlite:///" + path, settings)
+        self.addCleanup(engine.dispose)
+        StudentManagementSystem(session=sessionmaker(bind=engine)()).init_db()
+
+        def hold_write_lock(seconds):
+            # Another connection keeps the database locked for a while
+            blocker = sqlite3.connect(path, check_same_thread=False)
+            blocker.execute("BEGIN IMMEDIATE")
+            timer = threading.Timer(seconds, blocker.rollback)
+            timer.start()
+            self.addCleanup(blocker.close)
+            self.addCleanup(timer.join)
+
+        sms = StudentManagementSystem(session=sessionmaker(bind=engine)(), lock_retries=8, lock_retry_backoff_ms=20)
+        self.addCleanup(sms.session.close)
+        hold_write_lock(0.2)
+        sms.add_student("John Doe", "john@example.com", 25)
+        self.assertEqual(sms.session.query(Student).count(), 1)
+
+        impatient = StudentManagementSystem(session=sessionmaker(bind=engine)(), lock_retries=0)
+        self.addCleanup(impatient.session.close)
+        hold_write_lock(0.2)
+        with self.assertRaises(OperationalError):
+            impatient.add_student("Jane Doe", "jane@example.com", 22)
+
+    def test_generate_reports(self):
+        engine = create_engine("sqlite:///" + os.path.join(self.directory, "reports.db"))
+        self.addCleanup(engine.dispose)
+        sms = StudentManagementSystem(session=sessionmaker(bind=engine)())
+        self.addCleanup(sms.session.close)
+        sms.init_db()
+        generate_synthetic_data(students=20, courses=5, enrollments_per_student=2, engine=engine)
+
+        output_dir = os.path.join(self.directory, "reports")
+        summary = sms.generate_reports(output_dir, workers=2)
+
+        self.assertEqual((summary["courses"], summary["records"], summary["workers"]), (5, 40, 2))
+        with open(os.path.join(output_dir, "SYN000001.json")) as f:
+            report = json.load(f)
+        self.assertEqual(report["performance_records"], sms.get_performance_records("SYN000001"))
+        self.assertEqual([row["rank"] for row in report["ranking"]],
+                         [row.rank for row in sms.rank_students("SYN000001")])
+        self.assertEqual(len(os.listdir(output_dir)), 5)
+        self.assertEqual(summary["unknown_courses"], [])
+
+        # An unknown code is reported instead of aborting the run
+        summary = sms.generate_reports(output_dir, workers=2, course_codes="SYN000002,NOPE")
+        self.assertEqual((summary["courses"], summary["unknown_courses"]), (1, ["NOPE"]))
+        self.assertFalse(os.path.exists(os.path.join(output_dir, "NOPE.json")))
+
+    def test_generate_reports_needs_a_shared_database(self):
+        sms = StudentManagementSystem(session=sessionmaker(bind=create_engine("sqlite://"))())
+        self.addCleanup(sms.session.close)
+        with self.assertRaises(ValueError):
+            sms.generate_reports(os.path.join(self.directory, "reports"))
+
+    def test_bulk_deletes_cascade(self):
+        engine = create_engine_from_config("sqlite:///" + os.path.join(self.directory, "cascade.db"))
+        self.addCleanup(engine.dispose)
+        sms = StudentManagementSystem(session=sessionmaker(bind=engine)())
+        self.addCleanup(sms.session.close)
+        sms.init_db()
+        generate_synthetic_data(students=10, courses=4, enrollments_per_student=2, engine=engine)
+
+        counts = sms.delete_students("1,2,3")
+        self.assertEqual(counts, {"students": 3, "performance_records": 6, "enrollments": 6, "attendance_log": 0})
+        self.assertEqual(sms.session.query(PerformanceRecord).filter(PerformanceRecord.student_id <= 3).count(), 0)
+
+        remaining = sms.session.query(PerformanceRecord).filter_by(course_id=1).count()
+        stats = sms.session.query(CourseStats).filter_by(course_id=1).count()
+        counts = sms.delete_courses(["SYN000001"])
+        self.assertEqual((counts["courses"], counts["performance_records"]), (1, remaining))
+        self.assertEqual(counts["course_stats"], stats)
+        self.assertGreater(stats, 0)
+        self.assertIsNone(sms.session.get(CourseStats, (1, "A")))
+        self.assertEqual(sms.rebuild_course_stats()["drift"], [])
+        self.assertEqual(sms.get_course_info("SYN000001"), "Course with code SYN000001 is not found.")
+
+        # A single delete also leaves the dependent rows to the database
+        sms.delete_course("SYN000002")
+        self.assertEqual(sms.session.query(PerformanceRecord).filter_by(course_id=2).count(), 0)
+
+        with self.assertRaises(ValueError):
+            sms.delete_students()
+
+    def test_importing_main_has_no_side_effects(self):
+        # Importing the CLI module must not open the database or pull in fire
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        output = subprocess.run(
+            [sys.executable, "-c", "import sys, lib.main; print('fire' in sys.modules)"],
+            cwd=self.directory, env={**os.environ, "PYTHONPATH": root},
+            capture_output=True, text=True, check=True,
+        ).stdout
+
+        self.assertEqual(output.strip(), "False")
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    def test_synthetic_data_is_deterministic(self):
+        def generate(seed):
+            engine = create_engine("sqlite:///:memory:")
+            self.addCleanup(engine.dispose)
+            counts = generate_synthetic_data(students=40, courses=6, enrollments_per_student=3,
+                                             seed=seed, batch_size=25, engine=engine)
+            with engine.connect() as conn:
+                rows = [conn.exec_driver_sql(f"SELECT * FROM {table} ORDER BY 1, 2").all()
+                        for table in ("students", "courses", "performance_records", "enrollments")]
+            return counts, rows
+
+        counts, rows = generate(7)
+        self.assertEqual(counts, {"students": 40, "courses": 6, "performance_records": 120, "enrollments": 120})
+        self.assertEqual(generate(7)[1], rows)
+        self.assertNotEqual(generate(8)[1], rows)
+
+        # Every student is enrolled in distinct courses
+        records = rows[2]
+        self.assertEqual(len({(record[1], record[2]) for record in records}), len(records))
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        self.addCleanup(self.engine.dispose)
+        self.sms = StudentManagementSystem(session=sessionmaker(bind=self.engine)())
+        self.addCleanup(self.sms.session.close)
+        self.sms.init_db()
+        self.sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        self.sms.add_student("John Doe", "john@example.com", 25)
+        self.sms.add_performance_record(1, "MATH101", "A")
+
+    def test_profile_command_summary(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, "profile.ndjson")
+        cprofile_path = os.path.join(directory.name, "profile.out")
+
+        with profile_command("rank_students", engine=self.engine, slow_query_ms=0,
+                             cprofile_path=cprofile_path, output=output) as command_profile:
+            command_profile.result = self.sms.rank_students("MATH101")
+        with profile_command("update_student", engine=self.engine, output=output):
+            self.sms.update_student(1, "John Smith")
+
+        with open(output) as f:
+            ranking, update = [json.loads(line) for line in f]
+
+        self.assertEqual(ranking["command"], "rank_students")
+        self.assertEqual(ranking["statements"], 1)
+        self.assertEqual(ranking["rows_returned"], 1)
+        self.assertEqual(ranking["rows_fetched"], 1)
+        self.assertEqual(len(ranking["slow_queries"]), 1)
+        self.assertTrue(os.path.exists(cprofile_path))
+        self.assertEqual(update["rows_affected"], 1)
+        self.assertEqual(update["slow_queries"], [])
+        self.assertGreater(update["wall_ms"], 0)
+
+    def test_profile_counts_rows_of_dict_results(self):
+        self.sms.add_student("Jane Smith", "jane@example.com", 22)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, "profile.ndjson")
+
+        with profile_command("list_students", engine=self.engine, output=output) as command_profile:
+            command_profile.result = self.sms.list_students(limit=10)
+        with profile_command("get_course_stats", engine=self.engine, output=output) as command_profile:
+            command_profile.result = self.sms.get_course_stats("MATH101")
+
+        with open(output) as f:
+            page, stats = [json.loads(line) for line in f]
+        self.assertEqual((page["rows_returned"], page["rows_fetched"]), (2, 2))
+        self.assertEqual(stats["rows_returned"], 1)
+        self.assertGreater(stats["rows_fetched"], 0)
+
+    def test_query_profiler_detaches(self):
+        with QueryProfiler(self.engine) as profiler:
+            self.sms.get_student_info(1)
+        self.sms.get_student_info(1)
+        self.assertEqual(len(profiler.statements), 2)
+
+    def test_extract_profile_flag(self):
+        self.assertEqual(extract_profile_flag(["rank_students", "--profile", "MATH101"]),
+                         (True, ["rank_students", "MATH101"]))
+        self.assertEqual(extract_profile_flag(["rank_students"]), (False, ["rank_students"]))
+
+
+class TestAsyncStudentManagementSystem(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        # A file database, so every worker thread sees the same data
+        self.engine = create_engine_from_config("sqlite:///" + os.path.join(directory.name, "async.db"))
+        self.addCleanup(self.engine.dispose)
+        self.Session = sessionmaker(bind=self.engine)
+
+        sms = StudentManagementSystem(session=self.Session())
+        sms.init_db()
+        sms.add_course("Math 101", "MATH101", "Dr. Smith", "2023-09-01", "2023-12-15")
+        for student_id in range(1, 21):
+            sms.add_student(f"Student {student_id}", f"student{student_id}@example.com", 20)
+            sms.add_performance_record(student_id, "MATH101", "A" if student_id % 2 else "B")
+        sms.session.close()
+
+    def test_concurrent_lookups(self):
+        threads = set()
+
+        def session_factory():
+            threads.add(threading.get_ident())
+            return self.Session()
+
+        async def lookups():
+            async with AsyncStudentManagementSystem(session_factory, max_workers=4) as sms:
+                return await asyncio.gather(
+                    *(sms.get_student_info(student_id) for student_id in range(1, 21)),
+                    *(sms.get_course_info("MATH101") for _ in range(20)),
+                    sms.rank_students("MATH101", limit=3),
+                    sms.iter_performance_records("MATH101"),
+                )
+
+        results = asyncio.run(lookups())
+
+        self.assertIn("Name: Student 7\n", results[6])
+        self.assertTrue(results[39].startswith("Course Name: Math 101\n"))
+        self.assertEqual([row.student_id for row in results[40]], [1, 3, 5])
+        self.assertEqual(len(results[41]), 20)
+        self.assertGreater(len(threads), 1)
+
+    def test_writes_run_in_their_own_sessions(self):
+        async def writes():
+            async with AsyncStudentManagementSystem(self.Session) as sms:
+                await sms.add_student("New Student", "new@example.com", 30)
+                with self.assertRaises(Exception):
+                    await sms.add_student("New Student", "new@example.com", 30)
+                return await sms.get_student_info(21)
+
+        self.assertIn("Email: new@example.com\n", asyncio.run(writes()))
 
 
 if __name__ == '__main__':